@@ -0,0 +1,68 @@
+import random
+
+
+SUITS = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
+
+#blackjack value of every rank (an Ace counts 11 until the hand would bust)
+RANK_VALUES = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10,
+               'Jack': 10, 'Queen': 10, 'King': 10, 'Ace': 11}
+
+
+#Card Class: define card ranks and suits
+class Card:
+    #represents a single card, defined by its suit and rank
+    def __init__(self, suit, rank):
+        self.suit = suit
+        self.rank = rank
+
+    #returns a readable string representation of the card
+    def __repr__(self):
+        return f'{self.rank} of {self.suit}'
+
+    #returns the rank of the card
+    def return_rank(self):
+        return self.rank
+
+    #returns the suit of the card
+    def return_suit(self):
+        return self.suit
+
+
+#Deck Class: set up the deck, shuffle it, and handle card draws
+class Deck:
+    #initialises the deck by creating a full set of 52 cards and then shuffling them
+    def __init__(self, num_decks=1):
+        self.cards = []
+        for _ in range(num_decks):
+            for suit in SUITS:
+                for rank in RANKS:
+                    self.cards.append(Card(suit, rank))
+        self.shuffle()
+
+    #shuffles the deck to randomise the order of the cards
+    def shuffle(self):
+        random.shuffle(self.cards)
+
+    #draws the top card from the deck and returns it
+    def deal_card(self):
+        if not self.cards:
+            #reinitialises the deck and shuffles again if out of cards
+            self.__init__()
+            self.shuffle()
+            print("Deck was empty, reshuffled.")
+        return self.cards.pop()
+
+    #returns a string representation showing the number of cards left in the deck
+    def __repr__(self):
+        return f'Deck of {len(self.cards)} cards'
+
+
+#function to convert the rank of a card to a numerical value
+def convert_rank_to_value(card):
+    if card.rank == "Ace":
+        return 11
+    elif card.rank in ["Jack", "Queen", "King"]:
+        return 10
+    else:
+        return int(card.rank)
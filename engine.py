@@ -0,0 +1,537 @@
+import random
+
+from cards import Card, RANKS, RANK_VALUES, SUITS
+
+
+#blackjack value of each rank index, the engine deals rank indices so pairs are still matched by rank
+VALUES = tuple(RANK_VALUES[rank] for rank in RANKS)
+
+#representative rank for every upcard value the strategies can see (2-11)
+UPCARD_RANKS = {2: '2', 3: '3', 4: '4', 5: '5', 6: '6', 7: '7', 8: '8', 9: '9', 10: '10', 11: 'Ace'}
+
+#most cards of a round a recorder keeps, rounds dealing more are recorded as not replayable
+MAX_RECORDED_CARDS = 32
+
+#bump when a change to the engine changes the results of a seeded run, so cached results are recomputed
+ENGINE_VERSION = 1
+
+#scores 0-31 cover every final total (the highest is a hit on 21 drawing a 10)
+NUM_SCORES = 32
+
+#actions a compiled strategy can take on its first two cards
+HIT, STAND, DOUBLE, SURRENDER = 0, 1, 2, 3
+
+
+#Rules Class: the table rules a simulation is played under
+class Rules:
+
+    #defaults are a common multi-deck casino game: S17, 3:2, DAS, no surrender, resplit to four hands
+    def __init__(self, dealer_hits_soft_17=False, blackjack_payout=1.5, naturals=True,
+                 doubling=True, double_after_split=True, surrender=False,
+                 max_splits=3, penetration=0.75):
+        if blackjack_payout <= 0:
+            raise ValueError(f"blackjack_payout must be positive, got {blackjack_payout}")
+        if max_splits < 0:
+            raise ValueError(f"max_splits must be zero or more, got {max_splits}")
+        if not 0 <= penetration < 1:
+            raise ValueError(f"penetration must be in [0, 1), got {penetration}")
+        #dealer draws on soft 17 (H17) instead of standing on every 17 (S17)
+        self.dealer_hits_soft_17 = dealer_hits_soft_17
+        #payout for a two-card 21, 1.5 for 3:2 and 1.2 for 6:5
+        self.blackjack_payout = blackjack_payout
+        #settle two-card 21s (and the dealer peek) before the player acts
+        self.naturals = naturals
+        #player may double down on any first two cards
+        self.doubling = doubling
+        #player may double down on the first two cards of a split hand
+        self.double_after_split = double_after_split
+        #player may give up half the bet on the first two cards (late surrender)
+        self.surrender = surrender
+        #number of splits allowed in a round, 0 disables splitting
+        self.max_splits = max_splits
+        #fraction of the shoe dealt before it is reshuffled, 0 reshuffles before every round
+        self.penetration = penetration
+
+    #returns the rules as a tuple, used for comparisons and hashing
+    def key(self):
+        return (self.dealer_hits_soft_17, self.blackjack_payout, self.naturals, self.doubling,
+                self.double_after_split, self.surrender, self.max_splits, self.penetration)
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    #returns a readable string representation of the rules
+    def __repr__(self):
+        return (f"Rules(dealer_hits_soft_17={self.dealer_hits_soft_17}, "
+                f"blackjack_payout={self.blackjack_payout}, naturals={self.naturals}, "
+                f"doubling={self.doubling}, double_after_split={self.double_after_split}, "
+                f"surrender={self.surrender}, max_splits={self.max_splits}, "
+                f"penetration={self.penetration})")
+
+
+#rules played by Game in main.py: fresh shoe every round, even money, no naturals, no doubling or splitting
+REFERENCE_RULES = Rules(blackjack_payout=1.0, naturals=False, doubling=False,
+                        double_after_split=False, max_splits=0, penetration=0.0)
+
+#rules played by Game in blackjack_with_split.py: as above, with a single split
+REFERENCE_SPLIT_RULES = Rules(blackjack_payout=1.0, naturals=False, doubling=False,
+                              double_after_split=False, max_splits=1, penetration=0.0)
+
+
+#stand-in for a player's hand when a strategy is probed, has the attributes of both Player and Hand
+class _ProbeHand:
+    def __init__(self, ranks):
+        self.cards = [Card('Spades', rank) for rank in ranks]
+        self.hand = self.cards
+        self.total_score = sum(RANK_VALUES[rank] for rank in ranks)
+        aces = ranks.count('Ace')
+        while self.total_score > 21 and aces:
+            self.total_score -= 10
+            aces -= 1
+        self.bust = False
+
+
+#stand-in for the dealer when a strategy is probed
+class _ProbeDealer:
+    def __init__(self, upcard_value):
+        self.upcard = Card('Hearts', UPCARD_RANKS[upcard_value])
+
+    def show_uphand(self):
+        return self.upcard
+
+
+#representative cards for a hard or soft total
+def _probe_ranks(total, soft):
+    if soft:
+        return ['Ace', 'Ace'] if total == 12 else ['Ace', str(total - 11)]
+    if total == 4:
+        return ['2', '2']
+    if total <= 11:
+        return ['2', str(total - 2)]
+    if total <= 19:
+        return ['10', str(total - 10)]
+    if total == 20:
+        return ['King', '10']
+    return ['10', '9', '2']
+
+
+#DecisionTable Class: a strategy evaluated once for every hand it can be asked about
+class DecisionTable:
+
+    #strategies are assumed to depend only on the cards in the hand and the dealer's upcard
+    def __init__(self, strategy, rules):
+        self.strategy = strategy
+        self.rules = rules
+        #hits[soft][total][upcard]: whether to keep hitting after the first decision
+        self.hits = [[[False] * 12 for _ in range(22)] for _ in range(2)]
+        #first[soft][total][upcard] and first_split[...]: action on the first two cards (before/after a split)
+        self.first = [[[STAND] * 12 for _ in range(22)] for _ in range(2)]
+        self.first_split = [[[STAND] * 12 for _ in range(22)] for _ in range(2)]
+        #splits[pair value][upcard]: whether to split a pair
+        self.splits = [[False] * 12 for _ in range(12)]
+
+        for upcard in range(2, 12):
+            dealer = _ProbeDealer(upcard)
+            for soft, totals in ((0, range(4, 22)), (1, range(12, 22))):
+                for total in totals:
+                    action = strategy(None, _ProbeHand(_probe_ranks(total, soft)), dealer)
+                    self.hits[soft][total][upcard] = action in ('hit', 'double', 'surrender', 'split')
+                    self.first[soft][total][upcard] = self._first_action(action, rules.doubling, rules.surrender)
+                    self.first_split[soft][total][upcard] = self._first_action(
+                        action, rules.doubling and rules.double_after_split, False)
+            if rules.max_splits:
+                for value, rank in UPCARD_RANKS.items():
+                    action = strategy(None, _ProbeHand([rank, rank]), dealer)
+                    self.splits[value][upcard] = action == 'split'
+
+    #maps a strategy's answer to an action the rules allow, doubling and surrendering fall back to a hit,
+    #as does a split asked for on a hard 4 or soft 12 (the only totals probed with a pair)
+    def _first_action(self, action, can_double, can_surrender):
+        if action == 'double':
+            return DOUBLE if can_double else HIT
+        if action == 'surrender':
+            return SURRENDER if can_surrender else HIT
+        return HIT if action in ('hit', 'split') else STAND
+
+    #returns the table as nested tuples, a complete description of the strategy under these rules
+    def key(self):
+        return (tuple(tuple(map(tuple, table)) for table in (self.hits, self.first, self.first_split))
+                + (tuple(map(tuple, self.splits)),))
+
+
+#dealer routines, the engine picks one per rule set so the dealer loop never checks the rules
+def _dealer_stands_soft_17(draw, total, aces):
+    while total < 17:
+        value = VALUES[draw()]
+        total += value
+        if value == 11:
+            aces += 1
+        while total > 21 and aces:
+            total -= 10
+            aces -= 1
+    return total
+
+
+def _dealer_hits_soft_17(draw, total, aces):
+    while total < 17 or (total == 17 and aces):
+        value = VALUES[draw()]
+        total += value
+        if value == 11:
+            aces += 1
+        while total > 21 and aces:
+            total -= 10
+            aces -= 1
+    return total
+
+
+#Engine Class: fast simulation of rounds under a fixed strategy and rule set
+class Engine:
+
+    #builds the shoe, compiles the strategy and picks the hand-resolution routines for the rules,
+    #a recorder (see hand_trace.py) is given every round's cards, hands and outcome
+    def __init__(self, strategy, num_decks=1, rules=None, rng=None, recorder=None):
+        self.rules = rules if rules is not None else Rules()
+        self.num_decks = num_decks
+        #shuffles with the random module by default, so random.seed() reproduces a run
+        self.rng = rng if rng is not None else random
+        #rank indices in the same order as Deck builds its cards, so the same shuffle gives the same shoe
+        self.full_shoe = [index for _ in range(num_decks) for _ in SUITS for index in range(len(RANKS))]
+        self.shoe = []
+        self.shuffles = 0
+        self.reshuffle_at = len(self.full_shoe) - int(len(self.full_shoe) * self.rules.penetration)
+        self.table = DecisionTable(strategy, self.rules)
+        self.splits_left = 0
+
+        self._dealer_play = _dealer_hits_soft_17 if self.rules.dealer_hits_soft_17 else _dealer_stands_soft_17
+        self._play_player = self._play_with_splits if self.rules.max_splits else self._play_without_splits
+        self._resolve = self._resolve_with_naturals if self.rules.naturals else self._resolve_played
+
+        self.strategy = strategy
+        self.recorder = None
+        if recorder is not None:
+            self.attach_recorder(recorder)
+
+    #recording swaps in wrappers once, so an engine without a recorder pays nothing for it,
+    #the recorder is told how the engine plays (rules, strategy, decks) before its first round
+    def attach_recorder(self, recorder):
+        self.recorder = recorder
+        self.dealt = []
+        self.hands = []
+        self._play_player_unrecorded = self._play_player
+        self._play_player = self._play_player_recorded
+        self.play_round = self._play_round_recorded
+        recorder.attach(self)
+
+    #puts every card back in the shoe and shuffles it
+    def reshuffle(self):
+        self.shuffles += 1
+        self.shoe[:] = self.full_shoe
+        self.rng.shuffle(self.shoe)
+
+    #draws the top card of the shoe, reshuffling if a round runs it dry
+    def draw(self):
+        if not self.shoe:
+            self.reshuffle()
+        return self.shoe.pop()
+
+    #draws a card and notes it for the recorder
+    def _draw_recorded(self):
+        shoe = self.shoe
+        if not shoe:
+            self.reshuffle()
+        rank = shoe.pop()
+        self.dealt.append(rank)
+        return rank
+
+    #plays the player's hands and keeps them for the recorder
+    def _play_player_recorded(self, first_rank, second_rank, upcard):
+        self.hands = self._play_player_unrecorded(first_rank, second_rank, upcard)
+        return self.hands
+
+    #plays a round and hands everything dealt and decided in it to the recorder
+    def _play_round_recorded(self):
+        shoe = self.shoe
+        if len(shoe) <= self.reshuffle_at:
+            self.reshuffle()
+        self.hands = []
+        start = len(shoe)
+        shuffles = self.shuffles
+        if start > MAX_RECORDED_CARDS:
+            #the round is dealt from the end of the shoe, so copying the end beforehand is enough to know its cards
+            tail = shoe[-MAX_RECORDED_CARDS:]
+            outcomes, net, player_score, dealer_score = self._deal_round()
+            num_cards = start - len(shoe) if self.shuffles == shuffles else len(tail) + 1
+            dealt = tail[:-min(num_cards, len(tail)) - 1:-1]
+        else:
+            #a round that may run the shoe dry notes its cards one by one instead
+            self.dealt = []
+            self.draw = self._draw_recorded
+            try:
+                outcomes, net, player_score, dealer_score = self._deal_round()
+            finally:
+                del self.draw
+            dealt = self.dealt
+            num_cards = len(dealt)
+        self.recorder.record(dealt, num_cards, outcomes, net, self.hands, player_score, dealer_score)
+        return outcomes, net, player_score, dealer_score
+
+    #plays a hand from its first two cards and appends (total, stake, surrendered) to hands
+    def _play_hand(self, first_rank, second_rank, upcard, first, hands):
+        draw = self.draw
+        total, aces = _two_card_total(VALUES[first_rank], VALUES[second_rank])
+
+        action = first[aces > 0][total][upcard]
+        if action == STAND:
+            hands.append((total, 1, False))
+            return
+        if action == SURRENDER:
+            hands.append((total, 1, True))
+            return
+
+        hits = self.table.hits
+        while True:
+            value = VALUES[draw()]
+            total += value
+            if value == 11:
+                aces += 1
+            while total > 21 and aces:
+                total -= 10
+                aces -= 1
+            if action == DOUBLE:
+                hands.append((total, 2, False))
+                return
+            if total > 21 or not hits[aces > 0][total][upcard]:
+                hands.append((total, 1, False))
+                return
+
+    #player routine for rules without splitting
+    def _play_without_splits(self, first_rank, second_rank, upcard):
+        hands = []
+        self._play_hand(first_rank, second_rank, upcard, self.table.first, hands)
+        return hands
+
+    #player routine for rules with splitting, hands are played in the order they were split
+    def _play_with_splits(self, first_rank, second_rank, upcard):
+        hands = []
+        self.splits_left = self.rules.max_splits
+        if first_rank == second_rank and self.table.splits[VALUES[first_rank]][upcard]:
+            self._split(first_rank, upcard, hands)
+        else:
+            self._play_hand(first_rank, second_rank, upcard, self.table.first, hands)
+        return hands
+
+    #splits a pair, deals each new hand its second card, then plays (or resplits) each of them
+    def _split(self, rank, upcard, hands):
+        self.splits_left -= 1
+        seconds = (self.draw(), self.draw())
+        for second_rank in seconds:
+            if (self.splits_left and second_rank == rank
+                    and self.table.splits[VALUES[rank]][upcard]):
+                self._split(rank, upcard, hands)
+            else:
+                self._play_hand(rank, second_rank, upcard, self.table.first_split, hands)
+
+    #settles the player's hands against the dealer and returns (outcomes, net units won)
+    def _settle(self, hands, dealer_total):
+        outcomes = []
+        net = 0.0
+        for total, stake, surrendered in hands:
+            if surrendered:
+                outcomes.append('losses')
+                net -= 0.5
+            elif total > 21:
+                outcomes.append('losses')
+                net -= stake
+            elif dealer_total > 21 or total > dealer_total:
+                outcomes.append('wins')
+                net += stake
+            elif total < dealer_total:
+                outcomes.append('losses')
+                net -= stake
+            else:
+                outcomes.append('ties')
+        return outcomes, net
+
+    #deals a round from the shoe and resolves it, returns (outcomes, net units won, player score, dealer score)
+    def play_round(self):
+        if len(self.shoe) <= self.reshuffle_at:
+            self.reshuffle()
+        return self._deal_round()
+
+    #deals a round from the shoe as it stands and resolves it
+    def _deal_round(self):
+        draw = self.draw
+        #same dealing order as Game.deal_cards: two to the player, then two to the dealer
+        first_rank = draw()
+        second_rank = draw()
+        upcard_rank = draw()
+        hole_rank = draw()
+        return self._resolve(first_rank, second_rank, upcard_rank, hole_rank)
+
+    #resolves a dealt round by playing it out, as in Game.play_round
+    def _resolve_played(self, first_rank, second_rank, upcard_rank, hole_rank):
+        upcard = VALUES[upcard_rank]
+        dealer_total, dealer_aces = _two_card_total(upcard, VALUES[hole_rank])
+
+        hands = self._play_player(first_rank, second_rank, upcard)
+        for total, stake, surrendered in hands:
+            if total <= 21 and not surrendered:
+                dealer_total = self._dealer_play(self.draw, dealer_total, dealer_aces)
+                break
+        outcomes, net = self._settle(hands, dealer_total)
+        return outcomes, net, hands[0][0], dealer_total
+
+    #resolves a dealt round, paying or collecting two-card 21s before anyone acts
+    def _resolve_with_naturals(self, first_rank, second_rank, upcard_rank, hole_rank):
+        player_total = _two_card_total(VALUES[first_rank], VALUES[second_rank])[0]
+        dealer_total = _two_card_total(VALUES[upcard_rank], VALUES[hole_rank])[0]
+        if player_total == 21 and dealer_total == 21:
+            return ['ties'], 0.0, 21, 21
+        if player_total == 21:
+            return ['wins'], self.rules.blackjack_payout, 21, dealer_total
+        if dealer_total == 21:
+            return ['losses'], -1.0, player_total, 21
+        return self._resolve_played(first_rank, second_rank, upcard_rank, hole_rank)
+
+
+#returns the total and number of soft aces of a two-card hand
+def _two_card_total(first_value, second_value):
+    total = first_value + second_value
+    aces = (first_value == 11) + (second_value == 11)
+    if total > 21:
+        return total - 10, aces - 1
+    return total, aces
+
+
+#run a simulation of the engine with a given strategy, number of trials, number of decks and rules,
+#the rules default to the ones main.Game plays by, so a call without them gives the numbers it always has
+def run_simulation(strategy, num_trials=100000, num_decks=1, rules=REFERENCE_RULES, seed=None, cache=None):
+    #with a ResultCache (see result_cache.py) only the compact aggregates are kept, without the player_scores and
+    #dealer_scores lists, and only the trials not yet cached are played
+    if cache is not None:
+        return _run_cached(strategy, num_trials, num_decks, rules, seed, cache)
+    return simulate_engine(Engine(strategy, num_decks, rules, random.Random(seed) if seed is not None else None), num_trials)
+
+
+#plays num_trials rounds on an engine and returns the run_simulation results
+def simulate_engine(engine, num_trials):
+    #the aggregates every run returns (counts, rounds, net and its square for the variance, score histograms),
+    #plus every score, which only an uncached run keeps
+    results = simulate_aggregates(engine, 0)
+    results['player_scores'] = player_scores = []
+    results['dealer_scores'] = dealer_scores = []
+    play_round = engine.play_round
+    player_histogram = results['player_histogram']
+    dealer_histogram = results['dealer_histogram']
+    net = 0.0
+    net_squared = 0.0
+    for _ in range(num_trials):
+        outcomes, round_net, player_score, dealer_score = play_round()
+        for outcome in outcomes:
+            results[outcome] += 1
+        net += round_net
+        net_squared += round_net * round_net
+        player_scores.append(player_score)
+        dealer_scores.append(dealer_score)
+        player_histogram[player_score] += 1
+        dealer_histogram[dealer_score] += 1
+    results['net'] = net
+    results['net_squared'] = net_squared
+    results['rounds'] = num_trials
+    return results
+
+
+#the shuffle state saved with cached results, so a top-up continues the same random stream
+def _engine_state(engine):
+    version, internal, gauss_next = engine.rng.getstate()
+    return {'rng': [version, list(internal), gauss_next], 'shoe': engine.shoe, 'shuffles': engine.shuffles}
+
+
+def _restore_engine_state(engine, state):
+    version, internal, gauss_next = state['rng']
+    engine.rng.setstate((version, tuple(internal), gauss_next))
+    engine.shoe[:] = state['shoe']
+    engine.shuffles = state['shuffles']
+
+
+#returns the aggregates of exactly num_trials rounds, equal to those of an uncached run with the same seed:
+#read from the cache when it holds that many, topped up from where the cached run stopped when it holds fewer,
+#and replayed from the seed (leaving the longer cached run alone) when it holds more
+def _run_cached(strategy, num_trials, num_decks, rules, seed, cache):
+    engine = Engine(strategy, num_decks, rules, random.Random(seed))
+    key = cache.key(engine.table, engine.rules, num_decks, seed)
+    entry = cache.get(key)
+    if entry is None:
+        results = simulate_aggregates(engine, num_trials)
+    else:
+        results = entry['results']
+        if results['rounds'] == num_trials:
+            return results
+        if results['rounds'] > num_trials:
+            return simulate_aggregates(engine, num_trials)
+        _restore_engine_state(engine, entry['state'])
+        simulate_aggregates(engine, num_trials - results['rounds'], results)
+    cache.put(key, {'results': results, 'state': _engine_state(engine)})
+    return results
+
+
+#plays num_trials rounds on an engine keeping only the outcome counts, the net and its square and the score
+#histograms, never every score, adding them to earlier aggregates if given
+def simulate_aggregates(engine, num_trials, results=None):
+    if results is None:
+        results = {'wins': 0, 'losses': 0, 'ties': 0, 'rounds': 0, 'net': 0.0, 'net_squared': 0.0,
+                   'player_histogram': [0] * NUM_SCORES, 'dealer_histogram': [0] * NUM_SCORES}
+    play_round = engine.play_round
+    player_histogram = results['player_histogram']
+    dealer_histogram = results['dealer_histogram']
+    net = results['net']
+    net_squared = results['net_squared']
+    for _ in range(num_trials):
+        outcomes, round_net, player_score, dealer_score = play_round()
+        for outcome in outcomes:
+            results[outcome] += 1
+        net += round_net
+        net_squared += round_net * round_net
+        player_histogram[player_score] += 1
+        dealer_histogram[dealer_score] += 1
+    results['net'] = net
+    results['net_squared'] = net_squared
+    results['rounds'] += num_trials
+    return results
+
+
+#returns the house edge (%) of a set of results and its standard error, from the per-round net and its square
+def house_edge_with_error(wins, losses, ties, net, net_squared, rounds):
+    hands = wins + losses + ties
+    house_edge = -net / hands * 100
+    if rounds < 2:
+        return house_edge, float('inf')
+    mean = net / rounds
+    variance = max(net_squared / rounds - mean * mean, 0.0) * rounds / (rounds - 1)
+    #the edge is quoted per hand, so the per-round error is scaled by rounds per hand
+    return house_edge, (variance / rounds) ** 0.5 * rounds / hands * 100
+
+
+#returns the house edge (%) and its standard error for a run_simulation results dictionary
+def results_edge_with_error(results):
+    return house_edge_with_error(results['wins'], results['losses'], results['ties'],
+                                 results['net'], results['net_squared'], results['rounds'])
+
+
+#adds the results of a further run to earlier results of the same cell
+def merge_results(total, results):
+    if total is None:
+        return results
+    if set(total) != set(results):
+        raise ValueError("cannot merge results with score lists into compact results, or the other way round")
+    for key, value in results.items():
+        if key.endswith('_histogram'):
+            total[key] = [count + more for count, more in zip(total[key], value)]
+        elif isinstance(value, list):
+            total[key].extend(value)
+        else:
+            total[key] += value
+    return total
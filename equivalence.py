@@ -0,0 +1,199 @@
+import contextlib
+import io
+import math
+import os
+import random
+from collections import Counter
+
+from engine import Engine
+
+
+#EQUIVALENCE_FAST=1 shrinks every sample, for CI
+FAST = os.environ.get('EQUIVALENCE_FAST') == '1'
+
+#rounds per sample in the statistical comparisons, and seeds in the hand-by-hand ones
+SAMPLE_ROUNDS = 3000 if FAST else 50000
+SEEDED_ROUNDS = 300 if FAST else 5000
+
+#a distribution check fails below this p-value, small so a correct engine almost never fails by chance
+ALPHA = 1e-3
+
+#final totals above this are grouped as busts
+BUST = 22
+
+
+#a strategy that splits often, so the split paths of Game and the engines are compared too,
+#splits every pair it is offered once, then hits to 17
+def split_pairs(game, hand, dealer):
+    if ((game is None or len(game.player.hands) == 1) and len(hand.cards) == 2
+            and hand.cards[0].rank == hand.cards[1].rank):
+        return "split"
+    return "hit" if hand.total_score < 17 else "stand"
+
+
+#plays one round of a reference Game (from main.py or blackjack_with_split.py) on the shoe random.seed(seed) shuffles,
+#returns (outcomes, player score, dealer score)
+def reference_round(game_class, strategy, num_decks, seed):
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = game_class(strategy, num_decks)
+        result = game.play_round()
+    if isinstance(result, list):
+        return result, game.player.hands[0].total_score, game.dealer.hands[0].total_score
+    return [result], game.player.total_score, game.dealer.total_score
+
+
+#plays one round of a fresh Engine on the shoe random.seed(seed) shuffles, returns (outcomes, player score, dealer score)
+def engine_round(strategy, num_decks, rules, seed):
+    random.seed(seed)
+    outcomes, net, player_score, dealer_score = Engine(strategy, num_decks, rules).play_round()
+    return outcomes, player_score, dealer_score
+
+
+#replays the same seeded shoes through the reference Game and a candidate, returns every round they disagree on
+#as (seed, reference result, candidate result); candidate(strategy, num_decks, rules, seed) defaults to the engine
+def seeded_mismatches(game_class, strategy, num_decks, rules, seeds, candidate=engine_round):
+    mismatches = []
+    for seed in seeds:
+        expected = reference_round(game_class, strategy, num_decks, seed)
+        actual = candidate(strategy, num_decks, rules, seed)
+        if tuple(actual) != expected:
+            mismatches.append((seed, expected, tuple(actual)))
+    return mismatches
+
+
+#Sample Class: outcome counts, final-total counts and per-round net of a set of rounds
+class Sample:
+
+    def __init__(self):
+        self.outcomes = Counter()
+        self.player_totals = Counter()
+        self.dealer_totals = Counter()
+        self.rounds = 0
+        self.net = 0.0
+        self.net_squared = 0.0
+
+    #adds one round, totals over 21 are counted together as a bust
+    def add(self, outcomes, net, player_score, dealer_score):
+        self.outcomes.update(outcomes)
+        self.player_totals[min(player_score, BUST)] += 1
+        self.dealer_totals[min(dealer_score, BUST)] += 1
+        self.rounds += 1
+        self.net += net
+        self.net_squared += net * net
+
+    #mean and variance of the net units won per round
+    def net_moments(self):
+        mean = self.net / self.rounds
+        return mean, max(self.net_squared / self.rounds - mean * mean, 0.0)
+
+
+#a sample of rounds played by a reference Game, each on its own seeded shoe, at even money as Game pays
+def reference_sample(game_class, strategy, num_decks, num_rounds, seed=0):
+    sample = Sample()
+    for round_seed in range(seed, seed + num_rounds):
+        outcomes, player_score, dealer_score = reference_round(game_class, strategy, num_decks, round_seed)
+        sample.add(outcomes, outcomes.count('wins') - outcomes.count('losses'), player_score, dealer_score)
+    return sample
+
+
+#a sample of rounds played by an Engine shuffling with its own random stream
+def engine_sample(strategy, num_decks, rules, num_rounds, seed=0):
+    sample = Sample()
+    play_round = Engine(strategy, num_decks, rules, random.Random(seed)).play_round
+    for _ in range(num_rounds):
+        sample.add(*play_round())
+    return sample
+
+
+#a sample built from the aggregates of parallel.run_parallel_simulation
+def histogram_sample(results):
+    sample = Sample()
+    sample.outcomes.update({'wins': results['wins'], 'losses': results['losses'], 'ties': results['ties']})
+    for totals, histogram in ((sample.player_totals, results['player_histogram']),
+                              (sample.dealer_totals, results['dealer_histogram'])):
+        for score, count in enumerate(histogram):
+            if count:
+                totals[min(score, BUST)] += int(count)
+    sample.rounds = results['rounds']
+    sample.net = results['net']
+    sample.net_squared = results['net_squared']
+    return sample
+
+
+#upper regularized incomplete gamma function Q(a, x), by its series below a + 1 and continued fraction above
+def _gamma_q(a, x):
+    if x <= 0:
+        return 1.0
+    scale = math.exp(-x + a * math.log(x) - math.lgamma(a))
+    if x < a + 1:
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(1.0 - total * scale, 0.0)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = b + an / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+    return scale * h
+
+
+#chi-square test that two sets of category counts come from one distribution, returns (statistic, dof, p-value),
+#categories expected fewer than 5 times in either sample are pooled into one
+def chi_square_homogeneity(counts_a, counts_b):
+    total_a = sum(counts_a.values())
+    total_b = sum(counts_b.values())
+    total = total_a + total_b
+    kept = []
+    pooled = [0, 0]
+    for category in sorted(set(counts_a) | set(counts_b)):
+        a, b = counts_a.get(category, 0), counts_b.get(category, 0)
+        if min(a + b, total) * min(total_a, total_b) / total < 5:
+            pooled[0] += a
+            pooled[1] += b
+        else:
+            kept.append((a, b))
+    if sum(pooled):
+        kept.append(tuple(pooled))
+    if len(kept) < 2:
+        return 0.0, 0, 1.0
+    statistic = 0.0
+    for a, b in kept:
+        expected_a = (a + b) * total_a / total
+        expected_b = (a + b) * total_b / total
+        statistic += (a - expected_a) ** 2 / expected_a + (b - expected_b) ** 2 / expected_b
+    dof = len(kept) - 1
+    return statistic, dof, _gamma_q(dof / 2, statistic / 2)
+
+
+#two-sample z test on the mean net per round, returns (z, two-sided p-value)
+def z_test_net(sample_a, sample_b):
+    mean_a, variance_a = sample_a.net_moments()
+    mean_b, variance_b = sample_b.net_moments()
+    error = math.sqrt(variance_a / sample_a.rounds + variance_b / sample_b.rounds)
+    if error == 0:
+        return 0.0, 1.0 if mean_a == mean_b else 0.0
+    z = (mean_a - mean_b) / error
+    return z, math.erfc(abs(z) / math.sqrt(2))
+
+
+#p-values of every comparison between a reference and a candidate sample
+def compare_samples(reference, candidate):
+    return {'outcomes': chi_square_homogeneity(reference.outcomes, candidate.outcomes)[2],
+            'player_totals': chi_square_homogeneity(reference.player_totals, candidate.player_totals)[2],
+            'dealer_totals': chi_square_homogeneity(reference.dealer_totals, candidate.dealer_totals)[2],
+            'net': z_test_net(reference, candidate)[1]}
@@ -0,0 +1,215 @@
+import argparse
+import contextlib
+import io
+import json
+import struct
+from collections import namedtuple
+
+import blackjack_with_split
+import main
+from cards import Card, RANKS, SUITS
+from engine import MAX_RECORDED_CARDS, REFERENCE_RULES, REFERENCE_SPLIT_RULES, Engine, Rules
+from strategies import STRATEGIES
+
+
+#a trace file starts with this, then the JSON header's length and the header itself: the rules, strategy and
+#number of decks the rounds were played with
+MAGIC = b'BJTRACE\x01'
+HEADER_LENGTH = struct.Struct('<I')
+
+#one fixed-width record per round: round number, card/hand counts, dealer and first-hand totals, net units,
+#then the rank indices dealt (in order) and each hand's outcome, final total and decision flags
+RECORD = struct.Struct('<QBBBBf32s4s4s4s')
+MAX_CARDS = MAX_RECORDED_CARDS
+MAX_HANDS = 4
+
+OUTCOMES = ('wins', 'losses', 'ties')
+OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+
+#hand flags: doubled down, surrendered, settled as a natural before anyone acted
+DOUBLED, SURRENDERED, NATURAL = 1, 2, 4
+
+#a decoded record, hits and splits follow from the cards: a split hand starts with the pair card
+HandRecord = namedtuple('HandRecord', ['round_number', 'num_cards', 'player_score', 'dealer_total', 'net',
+                                       'cards', 'outcomes', 'hand_totals', 'hand_flags'])
+
+#how a trace was made, rules is a Rules and num_decks is inf for an infinite-deck engine
+TraceHeader = namedtuple('TraceHeader', ['rules', 'strategy', 'num_decks'])
+
+
+#single bytes for the outcome of a lone hand and for small values, so the common round packs without building lists
+OUTCOME_BYTES = {outcome: bytes((code,)) for outcome, code in OUTCOME_CODES.items()}
+BYTES = [bytes((value,)) for value in range(256)]
+
+
+#the per-hand fields of a record: outcome codes, final totals and flags
+def _hand_fields(outcomes, hands, player_score):
+    if len(hands) == 1:
+        total, stake, surrendered = hands[0]
+        return OUTCOME_BYTES[outcomes[0]], BYTES[total], BYTES[(stake == 2) * DOUBLED | surrendered * SURRENDERED]
+    if not hands:
+        return OUTCOME_BYTES[outcomes[0]], BYTES[player_score], BYTES[NATURAL]
+    hands = hands[:MAX_HANDS]
+    return (bytes([OUTCOME_CODES[outcome] for outcome in outcomes[:MAX_HANDS]]),
+            bytes([hand[0] for hand in hands]),
+            bytes([(hand[1] == 2) * DOUBLED | hand[2] * SURRENDERED for hand in hands]))
+
+
+#unpacks the record at offset in data
+def decode(data, offset=0):
+    (round_number, num_cards, num_hands, dealer_total, player_score, net,
+     cards, outcomes, totals, flags) = RECORD.unpack_from(data, offset)
+    return HandRecord(round_number, num_cards, player_score, dealer_total, net, tuple(cards[:min(num_cards, MAX_CARDS)]),
+                      tuple(OUTCOMES[code] for code in outcomes[:num_hands]), tuple(totals[:num_hands]),
+                      tuple(flags[:num_hands]))
+
+
+#the header of a trace as bytes
+def encode_header(header):
+    data = json.dumps({'rules': list(header.rules.key()), 'strategy': header.strategy,
+                       'num_decks': header.num_decks}).encode()
+    return MAGIC + HEADER_LENGTH.pack(len(data)) + data
+
+
+#the header at the start of data and the offset of the first record, (None, 0) for a trace written without one
+def decode_header(data):
+    if not data.startswith(MAGIC):
+        return None, 0
+    start = len(MAGIC) + HEADER_LENGTH.size
+    end = start + HEADER_LENGTH.unpack_from(data, len(MAGIC))[0]
+    fields = json.loads(data[start:end])
+    return TraceHeader(Rules(*fields['rules']), fields['strategy'], fields['num_decks']), end
+
+
+#TraceRecorder Class: keeps the last capacity rounds in a ring buffer, or writes every round to a binary file
+#after a header saying how they were played
+class TraceRecorder:
+
+    def __init__(self, capacity=65536, path=None):
+        self.capacity = capacity
+        self.path = path
+        self.rounds = 0
+        self.header = None
+        self.buffer = bytearray(capacity * RECORD.size) if path is None else None
+        self.file = None
+
+    #called by the engine the recorder is given to, opens the file and writes the header
+    def attach(self, engine):
+        if self.header is not None:
+            raise ValueError("a TraceRecorder records a single engine")
+        self.header = TraceHeader(engine.rules, engine.strategy.__name__, engine.num_decks)
+        if self.path is not None:
+            self.file = open(self.path, 'wb')
+            self.file.write(encode_header(self.header))
+
+    #called by Engine after every round
+    def record(self, cards, num_cards, outcomes, net, hands, player_score, dealer_score):
+        outcome_codes, totals, flags = _hand_fields(outcomes, hands, player_score)
+        fields = (self.rounds, num_cards if num_cards < 256 else 255, len(totals), dealer_score, player_score, net,
+                  bytes(cards), outcome_codes, totals, flags)
+        if self.file is not None:
+            self.file.write(RECORD.pack(*fields))
+        else:
+            RECORD.pack_into(self.buffer, (self.rounds % self.capacity) * RECORD.size, *fields)
+        self.rounds += 1
+
+    #the rounds still held in the ring buffer, oldest first
+    def records(self):
+        if self.path is not None:
+            raise ValueError("a recorder writing to a file keeps no records, use read_trace()")
+        first = max(self.rounds - self.capacity, 0)
+        return [decode(self.buffer, (round_number % self.capacity) * RECORD.size)
+                for round_number in range(first, self.rounds)]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+#reads every record from a trace file
+def read_trace(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    start = decode_header(data)[1]
+    return [decode(data, offset) for offset in range(start, len(data) - RECORD.size + 1, RECORD.size)]
+
+
+#reads the header of a trace file, None for a trace written without one
+def read_header(path):
+    with open(path, 'rb') as file:
+        data = file.read(len(MAGIC) + HEADER_LENGTH.size)
+        if not data.startswith(MAGIC):
+            return None
+        data += file.read(HEADER_LENGTH.unpack_from(data, len(MAGIC))[0])
+    return decode_header(data)[0]
+
+
+#stacks a deck so the recorded cards come off the top in the order they were dealt
+def _stacked_cards(record):
+    if record.num_cards > MAX_CARDS:
+        raise ValueError(f"round {record.round_number} dealt {record.num_cards} cards, "
+                         f"only the first {MAX_CARDS} were recorded")
+    return [Card(SUITS[position % len(SUITS)], RANKS[rank]) for position, rank in reversed(list(enumerate(record.cards)))]
+
+
+#replays a recorded round through Game (blackjack_with_split.py when split, else main.py),
+#returns the outcomes and the per-hand narration
+def replay_game(record, strategy, split=False):
+    module = blackjack_with_split if split else main
+    narration = io.StringIO()
+    with contextlib.redirect_stdout(narration):
+        game = module.Game(strategy)
+        game.deck.cards = _stacked_cards(record)
+        result = game.play_round()
+    return (result if split else [result]), narration.getvalue()
+
+
+#replays a recorded round through an Engine with the given rules, returns (outcomes, net, player score, dealer score)
+def replay_engine(record, strategy, rules=None):
+    engine = Engine(strategy, 1, rules)
+    #never reshuffle before the round, the stacked cards are the shoe
+    engine.reshuffle_at = -1
+    engine.shoe[:] = [RANKS.index(card.rank) for card in _stacked_cards(record)]
+    return engine.play_round()
+
+
+#replays a recorded round through the Game that plays its rules, or through an Engine when no Game does,
+#returns (outcomes, narration, what it was replayed through)
+def replay(record, strategy, rules):
+    if rules == REFERENCE_RULES:
+        return (*replay_game(record, strategy), 'main.Game')
+    if rules == REFERENCE_SPLIT_RULES:
+        return (*replay_game(record, strategy, split=True), 'blackjack_with_split.Game')
+    return replay_engine(record, strategy, rules)[0], '', 'Engine'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded round through Game, or the engine for rules Game cannot play")
+    parser.add_argument('trace', help="binary trace file written by TraceRecorder")
+    parser.add_argument('round', type=int, help="round number to replay")
+    parser.add_argument('--strategy', choices=[strategy.__name__ for strategy in STRATEGIES],
+                        help="strategy to replay with, by default the one in the trace header")
+    parser.add_argument('--split', action='store_true',
+                        help="for a trace without a header: it was played by blackjack_with_split.Game's rules")
+    args = parser.parse_args()
+
+    header = read_header(args.trace)
+    if header is None:
+        print("Trace has no header, assuming the rules of " + ("blackjack_with_split.py" if args.split else "main.py"))
+        header = TraceHeader(REFERENCE_SPLIT_RULES if args.split else REFERENCE_RULES, None, None)
+    strategies = {strategy.__name__: strategy for strategy in STRATEGIES}
+    strategy_name = args.strategy or header.strategy
+    if strategy_name not in strategies:
+        parser.error(f"the trace was recorded with {strategy_name!r}, pass --strategy to replay it with a known one")
+    records = {record.round_number: record for record in read_trace(args.trace)}
+    if args.round not in records:
+        parser.error(f"round {args.round} is not in the trace, it holds rounds {min(records, default=0)} "
+                     f"to {max(records, default=-1)}")
+    record = records[args.round]
+    outcomes, narration, replayed_by = replay(record, strategies[strategy_name], header.rules)
+    print(narration, end='')
+    decks = f" with {header.num_decks} decks" if header.num_decks is not None else ""
+    print(f"Recorded under {header.rules}{decks}: {list(record.outcomes)} (net {record.net:+.2f}), "
+          f"replayed through {replayed_by}: {outcomes}")
+    if outcomes != list(record.outcomes):
+        print("Replay DIFFERS from the recorded outcome")
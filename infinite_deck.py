@@ -0,0 +1,200 @@
+import numpy as np
+
+from cards import RANKS
+from engine import (DOUBLE, REFERENCE_RULES, STAND, SURRENDER, VALUES, DecisionTable, Engine, _two_card_total,
+                    simulate_engine)
+from strategies import STRATEGIES
+
+
+#chance of drawing each rank index from an infinitely large shoe, the same for every rank as in a full deck
+RANK_PROBABILITIES = np.full(len(RANKS), 1 / len(RANKS))
+
+#chance of drawing each card value, tens, jacks, queens and kings all count 10
+VALUE_PROBABILITIES = {value: sum(probability for rank, probability in enumerate(RANK_PROBABILITIES.tolist())
+                                   if VALUES[rank] == value)
+                       for value in sorted(set(VALUES))}
+
+#cards drawn per call to the generator
+BATCH = 65536
+
+
+#InfiniteDeckEngine Class: the engine dealing from an infinitely large shoe, every card is drawn with replacement,
+#so there is no shoe to rebuild and the cards come from the generator a batch at a time
+class InfiniteDeckEngine(Engine):
+
+    def __init__(self, strategy, rules=REFERENCE_RULES, seed=None, batch=BATCH, recorder=None):
+        super().__init__(strategy, 1, rules)
+        self.num_decks = float('inf')
+        self.rng = np.random.default_rng(seed)
+        self.batch = batch
+        #the cards still to come never run short, a new batch is drawn only once the last one is used up
+        self.reshuffle_at = 0
+        if recorder is not None:
+            self.attach_recorder(recorder)
+
+    #replaces the spent batch with a new one, in one vectorized call
+    def reshuffle(self):
+        self.shuffles += 1
+        self.shoe[:] = self.rng.choice(len(RANKS), self.batch, p=RANK_PROBABILITIES).tolist()
+
+
+#run a simulation of the infinite-deck engine, returns the same results as run_simulation
+def run_infinite_simulation(strategy, num_trials=100000, rules=REFERENCE_RULES, seed=None):
+    return simulate_engine(InfiniteDeckEngine(strategy, rules, seed), num_trials)
+
+
+#adds a card value to a total with its soft aces, counting aces as 1 while the total is over 21
+def _add_card(total, aces, value):
+    total += value
+    if value == 11:
+        aces += 1
+    while total > 21 and aces:
+        total -= 10
+        aces -= 1
+    return total, aces
+
+
+#InfiniteDeckAnalysis Class: exact expectations of a compiled strategy when every card is drawn from RANK_PROBABILITIES,
+#the counterpart InfiniteDeckEngine runs are checked against
+class InfiniteDeckAnalysis:
+
+    def __init__(self, strategy, rules=REFERENCE_RULES):
+        self.rules = rules
+        self.table = DecisionTable(strategy, self.rules)
+        self.probabilities = RANK_PROBABILITIES.tolist()
+        self.dealer_memo = {}
+        self.drawn_memo = {}
+        self.split_memo = {}
+
+    #dealer final totals from a total and its soft aces, as {total: probability}
+    def dealer_totals(self, total, aces):
+        key = (total, aces)
+        if key not in self.dealer_memo:
+            if total > 17 or (total == 17 and not (aces and self.rules.dealer_hits_soft_17)):
+                totals = {total: 1.0}
+            else:
+                totals = {}
+                for value, probability in VALUE_PROBABILITIES.items():
+                    for final, chance in self.dealer_totals(*_add_card(total, aces, value)).items():
+                        totals[final] = totals.get(final, 0.0) + probability * chance
+            self.dealer_memo[key] = totals
+        return self.dealer_memo[key]
+
+    #player final totals once a hand draws, hitting on as the strategy says or taking one card when doubled
+    def drawn_totals(self, total, aces, upcard, doubled):
+        key = (total, aces, upcard, doubled)
+        if key not in self.drawn_memo:
+            hits = self.table.hits
+            totals = {}
+            for value, probability in VALUE_PROBABILITIES.items():
+                new_total, new_aces = _add_card(total, aces, value)
+                if doubled or new_total > 21 or not hits[new_aces > 0][new_total][upcard]:
+                    totals[new_total] = totals.get(new_total, 0.0) + probability
+                else:
+                    for final, chance in self.drawn_totals(new_total, new_aces, upcard, False).items():
+                        totals[final] = totals.get(final, 0.0) + probability * chance
+            self.drawn_memo[key] = totals
+        return self.drawn_memo[key]
+
+    #expected (wins, losses, ties, net) of one hand played from two cards against the dealer's final totals
+    def hand_expectation(self, first_value, second_value, upcard, first, dealer):
+        total, aces = _two_card_total(first_value, second_value)
+        action = first[aces > 0][total][upcard]
+        if action == SURRENDER:
+            return 0.0, 1.0, 0.0, -0.5
+        stake = 2 if action == DOUBLE else 1
+        finals = {total: 1.0} if action == STAND else self.drawn_totals(total, aces, upcard, action == DOUBLE)
+        wins = losses = ties = 0.0
+        for final, chance in finals.items():
+            if final > 21:
+                losses += chance
+                continue
+            for dealer_total, dealer_chance in dealer.items():
+                if dealer_total > 21 or final > dealer_total:
+                    wins += chance * dealer_chance
+                elif final < dealer_total:
+                    losses += chance * dealer_chance
+                else:
+                    ties += chance * dealer_chance
+        return wins, losses, ties, (wins - losses) * stake
+
+    #expected number of split hands played with a second card of another rank, and with a pair nothing can split,
+    #from the number of second cards still to deal and the splits left, a pair's rank coming up with chance pair
+    def split_hands(self, pending, splits_left, pair):
+        key = (pending, splits_left, pair)
+        if key not in self.split_memo:
+            if not pending:
+                counts = (0.0, 0.0)
+            else:
+                others, pairs = self.split_hands(pending - 1, splits_left, pair)
+                if splits_left:
+                    resplit_others, resplit_pairs = self.split_hands(pending + 1, splits_left - 1, pair)
+                    counts = ((1 - pair) * (others + 1) + pair * resplit_others, (1 - pair) * pairs + pair * resplit_pairs)
+                else:
+                    counts = (others + 1 - pair, pairs + pair)
+            self.split_memo[key] = counts
+        return self.split_memo[key]
+
+    #expected (wins, losses, ties, net) of splitting a pair of the given rank
+    def split_expectation(self, rank, upcard, dealer):
+        pair = self.probabilities[rank]
+        others, pairs = self.split_hands(2, self.rules.max_splits - 1, pair)
+        value = VALUES[rank]
+        first_split = self.table.first_split
+        expectation = [pairs * part for part in self.hand_expectation(value, value, upcard, first_split, dealer)]
+        for second_rank, probability in enumerate(self.probabilities):
+            if second_rank != rank:
+                weight = others * probability / (1 - pair)
+                for index, part in enumerate(self.hand_expectation(value, VALUES[second_rank], upcard, first_split, dealer)):
+                    expectation[index] += weight * part
+        return tuple(expectation)
+
+    #expected (wins, losses, ties, net) of a round from its four dealt cards
+    def round_expectation(self, first_rank, second_rank, upcard_rank, hole_rank):
+        first_value, second_value, upcard = VALUES[first_rank], VALUES[second_rank], VALUES[upcard_rank]
+        dealer_total, dealer_aces = _two_card_total(upcard, VALUES[hole_rank])
+        if self.rules.naturals:
+            player_total = _two_card_total(first_value, second_value)[0]
+            if player_total == 21 and dealer_total == 21:
+                return 0.0, 0.0, 1.0, 0.0
+            if player_total == 21:
+                return 1.0, 0.0, 0.0, self.rules.blackjack_payout
+            if dealer_total == 21:
+                return 0.0, 1.0, 0.0, -1.0
+        dealer = self.dealer_totals(dealer_total, dealer_aces)
+        if self.rules.max_splits and first_rank == second_rank and self.table.splits[first_value][upcard]:
+            return self.split_expectation(first_rank, upcard, dealer)
+        return self.hand_expectation(first_value, second_value, upcard, self.table.first, dealer)
+
+    #expected hands won, lost and tied and net units won per round, and the house edge (%) they give
+    def expectation(self):
+        totals = [0.0, 0.0, 0.0, 0.0]
+        probabilities = self.probabilities
+        ranks = range(len(RANKS))
+        for first_rank in ranks:
+            for second_rank in ranks:
+                for upcard_rank in ranks:
+                    for hole_rank in ranks:
+                        probability = (probabilities[first_rank] * probabilities[second_rank]
+                                       * probabilities[upcard_rank] * probabilities[hole_rank])
+                        for index, part in enumerate(self.round_expectation(first_rank, second_rank,
+                                                                            upcard_rank, hole_rank)):
+                            totals[index] += probability * part
+        wins, losses, ties, net = totals
+        return {'wins': wins, 'losses': losses, 'ties': ties, 'net': net,
+                'house_edge': -net / (wins + losses + ties) * 100}
+
+
+#exact infinite-deck expectations of a strategy under the rules, see InfiniteDeckAnalysis.expectation
+def exact_analysis(strategy, rules=REFERENCE_RULES):
+    return InfiniteDeckAnalysis(strategy, rules).expectation()
+
+
+if __name__ == "__main__":
+    #screens every strategy on an infinite deck: the exact house edge, then a sampled one to compare
+    for strategy in STRATEGIES:
+        exact = exact_analysis(strategy)
+        results = run_infinite_simulation(strategy, num_trials=200000, seed=0)
+        hands = results['wins'] + results['losses'] + results['ties']
+        print(f"{strategy.__name__}: exact house edge {exact['house_edge']:.3f}%, "
+              f"sampled {-results['net'] / hands * 100:.3f}% over {results['rounds']} rounds")
@@ -1,53 +1,10 @@
-import random
-import csv
-import os
-import matplotlib.pyplot as plt
+from cards import Card, Deck, convert_rank_to_value
+from engine import REFERENCE_RULES, run_simulation
+from reporting import analyze_results, format_results, generate_charts, score_column, summarize, write_results_csv
+from scheduler import run_adaptive_sweep
+from strategies import aggressive_strategy, basic_strategy, conservative_strategy
 
-#Card Class: define card ranks and suits
-class Card:
-    #represents a single card, defined by its suit and rank
-    def __init__(self, suit, rank):
-        self.suit = suit
-        self.rank = rank
 
-    #returns a readable string representation of the card
-    def __repr__(self):
-        return f'{self.rank} of {self.suit}'
-    
-    #returns the rank of the card
-    def return_rank(self):
-        return self.rank
-
-
-#Deck Class: set up the deck, shuffle it, and handle card draws
-class Deck:
-    #initialises the deck by creating a full set of 52 cards and then shuffling them
-    def __init__(self, num_decks=1):
-        self.cards = []
-        for _ in range(num_decks):
-            for suit in ['Hearts', 'Diamonds', 'Clubs', 'Spades']:
-                for rank in ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']:
-                    self.cards.append(Card(suit, rank))
-        self.shuffle()
-
-    #shuffles the deck to randomise the order of the cards
-    def shuffle(self):
-        random.shuffle(self.cards)
-
-    #draws the top card from the deck and returns it
-    def deal_card(self):
-        if not self.cards:
-            #reinitialises the deck and shuffles again if out of cards
-            self.__init__()
-            self.shuffle()  
-            print("Deck was empty, reshuffled.")
-        return self.cards.pop()
-
-    #returns a string representation showing the number of cards left in the deck
-    def __repr__(self):
-        return f'Deck of {len(self.cards)} cards'
-    
-    
 #Player Class: Blackjack player
 class Player:
     
@@ -199,163 +156,31 @@ class Game:
         return result.lower().replace("!", "s")
         
         
-#function to convert the rank of a card to a numerical value   
-def convert_rank_to_value(card):
-    if card.rank == "Ace":
-        return 11
-    elif card.rank in ["Jack", "Queen", "King"]:
-        return 10
-    else:
-        return int(card.rank)
-
-
-#Strategies
-
-#basic strategy: decisions based on the player's score and the dealer's visible card
-def basic_strategy(game, player, dealer):
-    player_score = player.total_score
-    dealer_rank_value = convert_rank_to_value(dealer.show_uphand())
-
-    if player_score <= 11:
-        return "hit"
-    elif player_score <= 16:
-        if dealer_rank_value >= 7:
-            return "hit"
-        else:
-            return "stand"
-    else:
-        return "stand"
-
-
-#aggressive strategy: player takes more risks
-def aggressive_strategy(game, player, dealer):
-    player_score = player.total_score
-    dealer_rank_value = convert_rank_to_value(dealer.show_uphand())
-
-    if player_score <= 15:
-        return "hit"
-    elif 16 <= player_score <= 17 and dealer_rank_value in [9, 10, 11]:
-        return "hit"
-    else:
-        return "stand"
-
-
-#cnservative strategy: player avoids risks
-def conservative_strategy(game, player, dealer):
-    player_score = player.total_score
-    dealer_rank_value = convert_rank_to_value(dealer.show_uphand())
-
-    if player_score <= 11:
-        return "hit"
-    elif player_score == 12:
-        if dealer_rank_value >= 7:
-            return "hit"
-        else:
-            return "stand"
-    else:
-        return "stand"
-
-
-#run a simulation of the game with a given strategy, number of trials and number of decks
-def run_simulation(strategy, num_trials=100000, num_decks=1):
-    #dictionary to keep track of wins, losses, ties and scores
-    results = {'wins': 0, 'losses': 0, 'ties': 0, 'player_scores': [], 'dealer_scores': []}
-    for _ in range(num_trials):
-        #create a new game instance with the specified strategy and number of decks
-        game = Game(strategy, num_decks)
-        #store the result of the round
-        result = game.play_round()
-        results[result] += 1
-        #add player's and dealer's total scores to the results dictionary
-        results['player_scores'].append(game.player.total_score)
-        results['dealer_scores'].append(game.dealer.total_score)
-    return results
-
-
-#analyze the results of the simulation
-def analyze_results(results):
-    total_games = results['wins']+results['losses']+results['ties']
-    #calculate the house edge as the percentage of losses minus wins
-    house_edge = (results['losses'] - results['wins']) / total_games * 100
-    print(f"Total games: {total_games}")
-    print(f"Wins: {results['wins']} ({results['wins'] / total_games * 100:.2f}%)")
-    print(f"Losses: {results['losses']} ({results['losses'] / total_games * 100:.2f}%)")
-    print(f"Ties: {results['ties']} ({results['ties'] / total_games * 100:.2f}%)")
-    print(f"Average Player Score: {sum(results['player_scores']) / len(results['player_scores']):.2f}")
-    print(f"Average Dealer Score: {sum(results['dealer_scores']) / len(results['dealer_scores']):.2f}")
-    print(f"House Edge: {house_edge:.2f}%")
-    return house_edge
-
-#charts from the results data
-def generate_charts(results_data):
-    strategies = list(set([data[0] for data in results_data]))
-    num_decks_list = sorted(list(set([data[1] for data in results_data])))
-
-    #plot House Edge for all strategies
-    plt.figure(figsize=(10, 5))
-    for strategy in strategies:
-        strategy_data = [data for data in results_data if data[0] == strategy]
-        num_decks = [data[1] for data in strategy_data]
-        house_edges = [float(data[5].strip('%')) for data in strategy_data]
-        plt.plot(num_decks, house_edges, marker='o', linestyle='-', label=strategy)
-
-    #labels and title
-    plt.xlabel('Number of Decks')
-    plt.ylabel('House Edge (%)')
-    plt.title('House Edge by Number of Decks for All Strategies')
-    plt.legend()
-    plt.grid(True)
-    plt.savefig('house_edge_comparison.png')
-    plt.close()
-
-
-    #plot Wins, Losses, and Ties for each strategy
-    for strategy in strategies:
-        strategy_data = [data for data in results_data if data[0] == strategy]
-        num_decks = [data[1] for data in strategy_data]
-        wins = [data[2] for data in strategy_data]
-        losses = [data[3] for data in strategy_data]
-        ties = [data[4] for data in strategy_data]
-
-        plt.figure(figsize=(10, 5))
-        plt.plot(num_decks, wins, marker='o', linestyle='-', label='Wins')
-        plt.plot(num_decks, losses, marker='o', linestyle='-', label='Losses')
-        plt.plot(num_decks, ties, marker='o', linestyle='-', label='Ties', color='green')
-        plt.xlabel('Number of Decks')
-        plt.ylabel('Count')
-        plt.title(f'Wins, Losses, and Ties by Number of Decks for {strategy}')
-        plt.grid(True)
-        plt.legend()
-        plt.savefig(f'{strategy}_results.png')
-        plt.close()
-
-
-#function to format results into a string
-def format_results(results):
-    #formatted string from the results dictionary
-    formatted_results = (f"Wins: {results['wins']}, "
-                         f"Losses: {results['losses']}, "
-                         f"Ties: {results['ties']}, "
-                         f"Player Scores: {', '.join(map(str, results['player_scores']))}, "
-                         f"Dealer Scores: {', '.join(map(str, results['dealer_scores']))}")
-    return formatted_results
-
-
-
-#run the game with a given strategy
-def main():
+#run the game with a given strategy, rules default to the ones Game plays by,
+#a hand_budget spreads that many hands over the cells adaptively instead of 1000 per cell,
+#a ResultCache (see result_cache.py) reuses the results of earlier runs of the 1000-hand cells (not with a hand_budget)
+def main(rules=REFERENCE_RULES, hand_budget=None, cache=None):
+    if hand_budget is not None and cache is not None:
+        raise ValueError("the result cache only covers the 1000-hand cells, pass hand_budget or cache, not both")
     #list of strategies to compare
     strategies = [basic_strategy, aggressive_strategy, conservative_strategy]
     #run the simulation with different number of decks
     num_decks_list=[1, 2, 4, 6, 8]
-    results_data = []   
+    results_data = []
+    summaries = []
+    if hand_budget is not None:
+        scheduled = run_adaptive_sweep(strategies, num_decks_list, hand_budget, rules)
     for strats in strategies:
         strategy_name = strats.__name__
         print(f"=================Running simulations for {strategy_name}=================")
         for num_decks in num_decks_list:
             print(f"--------------Running simulation with {num_decks} decks--------------")
-            results = run_simulation(strats, num_trials=1000, num_decks=num_decks)
+            if hand_budget is None:
+                results = run_simulation(strats, num_trials=1000, num_decks=num_decks, rules=rules, cache=cache)
+            else:
+                results = scheduled[(strats, num_decks)]
             house_edge = analyze_results(results)
+            summaries.append(summarize(strategy_name, num_decks, results, house_edge))
 
             #append individual results components instead of formatted string to allow for easier CSV writing
             results_data.append([strategy_name, 
@@ -364,19 +189,16 @@ def main():
                                  results['losses'], 
                                  results['ties'],
                                  f"{house_edge:.2f}%",
-                                 ', '.join(map(str, results['player_scores'])), 
-                                 ', '.join(map(str, results['dealer_scores']))
+                                 score_column(results, 'player'), 
+                                 score_column(results, 'dealer')
             ])
 
 
-    generate_charts(results_data) 
+    generate_charts(summaries)
 
 
     #save all results to a single CSV file with expanded headers
-    with open('simulation_results_detailed.csv', 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(['Strategy', 'Num_Decks', 'Wins', 'Losses', 'Ties', 'House Edge', 'Player Scores', 'Dealer Scores'])
-        writer.writerows(results_data)
+    write_results_csv(results_data, 'simulation_results_detailed.csv')
 
 
 
@@ -0,0 +1,120 @@
+import random
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import NUM_SCORES, REFERENCE_RULES, Engine
+
+#outcome counter columns
+WINS, LOSSES, TIES, ROUNDS = range(4)
+
+#rounds a worker plays between publishing its counters
+FLUSH_EVERY = 2000
+
+
+#SharedAccumulators Class: per-worker counters and score histograms in one shared memory block
+class SharedAccumulators:
+
+    #creates the block, or attaches to an existing one when given its name
+    def __init__(self, num_workers, name=None):
+        self.num_workers = num_workers
+        layout = [('counts', np.int64, 4), ('nets', np.float64, 2),
+                  ('player_histogram', np.int64, NUM_SCORES), ('dealer_histogram', np.int64, NUM_SCORES)]
+        size = sum(num_workers * width * np.dtype(dtype).itemsize for _, dtype, width in layout)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            #attaching registers the block with the resource tracker again (SharedMemory always does on POSIX),
+            #which is harmless because fork and spawn workers on POSIX reuse their parent's tracker and it keeps
+            #names in a set, so the owner's unlink still unregisters the block once; Windows tracks no shared memory
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+        #one row per worker, each worker only ever writes its own row
+        offset = 0
+        for field, dtype, width in layout:
+            array = np.ndarray((num_workers, width), dtype=dtype, buffer=self.shm.buf, offset=offset)
+            setattr(self, field, array)
+            offset += array.nbytes
+        if self.owner:
+            for field, _, _ in layout:
+                getattr(self, field)[:] = 0
+
+    #publishes a worker's running totals into its row
+    def publish(self, slot, wins, losses, ties, rounds, net, net_squared, player_histogram, dealer_histogram):
+        self.player_histogram[slot] = player_histogram
+        self.dealer_histogram[slot] = dealer_histogram
+        self.nets[slot] = (net, net_squared)
+        self.counts[slot] = (wins, losses, ties, rounds)
+
+    #sums the rows into a results dictionary, readable at any time for live progress
+    def totals(self):
+        counts = self.counts.sum(axis=0)
+        nets = self.nets.sum(axis=0)
+        return {'wins': int(counts[WINS]), 'losses': int(counts[LOSSES]), 'ties': int(counts[TIES]),
+                'rounds': int(counts[ROUNDS]), 'net': float(nets[0]), 'net_squared': float(nets[1]),
+                'player_histogram': self.player_histogram.sum(axis=0),
+                'dealer_histogram': self.dealer_histogram.sum(axis=0)}
+
+    #detaches from the block, the arrays must not be used afterwards
+    def close(self):
+        for field in ('counts', 'nets', 'player_histogram', 'dealer_histogram'):
+            setattr(self, field, None)
+        self.shm.close()
+
+    #frees the block, called by its creator once every worker is done
+    def unlink(self):
+        self.shm.unlink()
+
+
+#plays a worker's share of the trials, publishing into its own row every FLUSH_EVERY rounds
+def simulate_into(name, num_workers, slot, strategy, num_trials, num_decks, rules, seed):
+    accumulators = SharedAccumulators(num_workers, name)
+    try:
+        play_round = Engine(strategy, num_decks, rules, random.Random(seed)).play_round
+        counts = {'wins': 0, 'losses': 0, 'ties': 0}
+        player_histogram = [0] * NUM_SCORES
+        dealer_histogram = [0] * NUM_SCORES
+        net = 0.0
+        net_squared = 0.0
+        for played in range(1, num_trials + 1):
+            outcomes, round_net, player_score, dealer_score = play_round()
+            for outcome in outcomes:
+                counts[outcome] += 1
+            net += round_net
+            net_squared += round_net * round_net
+            player_histogram[player_score] += 1
+            dealer_histogram[dealer_score] += 1
+            if played % FLUSH_EVERY == 0 or played == num_trials:
+                accumulators.publish(slot, counts['wins'], counts['losses'], counts['ties'], played,
+                                     net, net_squared, player_histogram, dealer_histogram)
+    finally:
+        accumulators.close()
+
+
+#runs a simulation split across worker processes that add their results straight into shared memory,
+#progress (if given) is called with the running totals while the workers play
+def run_parallel_simulation(strategy, num_trials=100000, num_decks=1, rules=REFERENCE_RULES, workers=4,
+                            seed=None, progress=None, progress_interval=0.5):
+    seeds = random.Random(seed).sample(range(2 ** 62), workers)
+    shares = [num_trials // workers + (slot < num_trials % workers) for slot in range(workers)]
+    accumulators = SharedAccumulators(workers)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(simulate_into, accumulators.name, workers, slot, strategy,
+                                   shares[slot], num_decks, rules, seeds[slot])
+                       for slot in range(workers)]
+            pending = futures
+            while pending:
+                _, pending = wait(pending, timeout=progress_interval)
+                if progress is not None:
+                    progress(accumulators.totals())
+            for future in futures:
+                future.result()
+        results = accumulators.totals()
+    finally:
+        accumulators.close()
+        accumulators.unlink()
+    return results
@@ -0,0 +1,233 @@
+import csv
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+#charts are only ever saved to files, Agg needs no display and is safe in worker processes
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from engine import results_edge_with_error
+
+
+#analyze the results of the simulation
+def analyze_results(results):
+    total_games = results['wins']+results['losses']+results['ties']
+    #calculate the house edge as the net units lost per hand, which is the percentage of losses minus wins at even money
+    if 'net' in results:
+        house_edge = -results['net'] / total_games * 100
+    else:
+        house_edge = (results['losses'] - results['wins']) / total_games * 100
+    print(f"Total games: {total_games}")
+    print(f"Wins: {results['wins']} ({results['wins'] / total_games * 100:.2f}%)")
+    print(f"Losses: {results['losses']} ({results['losses'] / total_games * 100:.2f}%)")
+    print(f"Ties: {results['ties']} ({results['ties'] / total_games * 100:.2f}%)")
+    #results of a parallel run carry score histograms instead of every score
+    if 'player_histogram' in results:
+        player_histogram, dealer_histogram = results['player_histogram'], results['dealer_histogram']
+        average_player = sum(score * count for score, count in enumerate(player_histogram)) / sum(player_histogram)
+        average_dealer = sum(score * count for score, count in enumerate(dealer_histogram)) / sum(dealer_histogram)
+    else:
+        average_player = sum(results['player_scores']) / len(results['player_scores'])
+        average_dealer = sum(results['dealer_scores']) / len(results['dealer_scores'])
+    print(f"Average Player Score: {average_player:.2f}")
+    print(f"Average Dealer Score: {average_dealer:.2f}")
+    print(f"House Edge: {house_edge:.2f}%")
+    return house_edge
+
+
+#aggregate results of one (strategy, num_decks) cell, what the charts are drawn from
+CellSummary = namedtuple('CellSummary', ['strategy', 'num_decks', 'wins', 'losses', 'ties', 'house_edge', 'std_error'],
+                         defaults=(None,))
+
+#charts show the house edge with a 95% confidence interval when its standard error is known
+CONFIDENCE_Z = 1.96
+
+#bump when a chart's look changes, so every cached figure is redrawn
+CHART_VERSION = 2
+
+#file in the output directory recording the hash of the data behind each chart
+CHART_MANIFEST = '.chart_manifest.json'
+
+
+#builds the summary of a cell from its simulation results and house edge
+def summarize(strategy_name, num_decks, results, house_edge):
+    std_error = None
+    if 'net_squared' in results and 'rounds' in results:
+        std_error = results_edge_with_error(results)[1]
+    return CellSummary(strategy_name, num_decks, results['wins'], results['losses'], results['ties'], house_edge, std_error)
+
+
+#groups the summaries by strategy in one pass, keeping the order strategies first appear in
+def _group_by_strategy(summaries):
+    grouped = {}
+    for summary in summaries:
+        grouped.setdefault(summary.strategy, []).append(summary)
+    for cells in grouped.values():
+        cells.sort(key=lambda cell: cell.num_decks)
+    return grouped
+
+
+#returns (filename, chart kind, data) for every chart, data is plain tuples so it can be hashed and pickled
+def chart_specs(summaries, suffix=''):
+    grouped = _group_by_strategy(summaries)
+    house_edges = tuple((strategy, tuple((cell.num_decks, cell.house_edge, cell.std_error) for cell in cells))
+                        for strategy, cells in grouped.items())
+    specs = [(f'house_edge_comparison{suffix}.png', 'house_edge', house_edges)]
+    for strategy, cells in grouped.items():
+        counts = tuple((cell.num_decks, cell.wins, cell.losses, cell.ties) for cell in cells)
+        specs.append((f'{strategy}_results{suffix}.png', 'results', (strategy, counts)))
+    totals = tuple((strategy, sum(cell.wins for cell in cells), sum(cell.losses for cell in cells),
+                    sum(cell.ties for cell in cells)) for strategy, cells in grouped.items())
+    specs.append((f'pie_charts{suffix}.png', 'pie', totals))
+    specs.append((f'bar_chart{suffix}.png', 'bar', house_edges))
+    return specs
+
+
+#plot House Edge for all strategies
+def _render_house_edge(path, house_edges):
+    plt.figure(figsize=(10, 5))
+    for strategy, points in house_edges:
+        num_decks = [point[0] for point in points]
+        edges = [point[1] for point in points]
+        line, = plt.plot(num_decks, edges, marker='o', linestyle='-', label=strategy)
+        #shaded 95% confidence interval around each curve
+        if all(point[2] is not None for point in points):
+            errors = [CONFIDENCE_Z * point[2] for point in points]
+            plt.fill_between(num_decks, [edge - error for edge, error in zip(edges, errors)],
+                             [edge + error for edge, error in zip(edges, errors)], color=line.get_color(), alpha=0.2)
+
+    #labels and title
+    plt.xlabel('Number of Decks')
+    plt.ylabel('House Edge (%)')
+    plt.title('House Edge by Number of Decks for All Strategies')
+    plt.legend()
+    plt.grid(True)
+    plt.savefig(path)
+    plt.close()
+
+
+#plot Wins, Losses, and Ties for one strategy
+def _render_results(path, data):
+    strategy, counts = data
+    num_decks = [count[0] for count in counts]
+    plt.figure(figsize=(10, 5))
+    plt.plot(num_decks, [count[1] for count in counts], marker='o', linestyle='-', label='Wins')
+    plt.plot(num_decks, [count[2] for count in counts], marker='o', linestyle='-', label='Losses')
+    plt.plot(num_decks, [count[3] for count in counts], marker='o', linestyle='-', label='Ties', color='green')
+    plt.xlabel('Number of Decks')
+    plt.ylabel('Count')
+    plt.title(f'Wins, Losses, and Ties by Number of Decks for {strategy}')
+    plt.grid(True)
+    plt.legend()
+    plt.savefig(path)
+    plt.close()
+
+
+#pie chart for each strategy, summarising the wins, losses, and ties across all decks
+def _render_pie(path, totals):
+    fig, axes = plt.subplots(1, len(totals), figsize=(5 * len(totals), 5), squeeze=False)
+    for ax, (strategy, wins, losses, ties) in zip(axes[0], totals):
+        ax.pie([wins, losses, ties], labels=['Wins', 'Losses', 'Ties'], autopct='%1.1f%%',
+               colors=['tab:blue', 'tab:orange', 'green'], startangle=90)
+        ax.set_title(strategy)
+    fig.suptitle('Wins, Losses, and Ties Across All Decks')
+    fig.savefig(path)
+    plt.close(fig)
+
+
+#grouped bar chart of the house edge by number of decks, one bar per strategy
+def _render_bar(path, house_edges):
+    num_decks_list = sorted({point[0] for _, points in house_edges for point in points})
+    width = 0.8 / max(len(house_edges), 1)
+    plt.figure(figsize=(10, 5))
+    for i, (strategy, points) in enumerate(house_edges):
+        edges = {point[0]: point[1] for point in points}
+        errors = {point[0]: CONFIDENCE_Z * point[2] for point in points if point[2] is not None}
+        positions = [j + (i - (len(house_edges) - 1) / 2) * width for j in range(len(num_decks_list))]
+        plt.bar(positions, [edges.get(num_decks, 0.0) for num_decks in num_decks_list], width, label=strategy,
+                yerr=[errors.get(num_decks, 0.0) for num_decks in num_decks_list] if errors else None, capsize=3)
+    plt.xticks(range(len(num_decks_list)), num_decks_list)
+    plt.xlabel('Number of Decks')
+    plt.ylabel('House Edge (%)')
+    plt.title('House Edge by Number of Decks')
+    plt.legend()
+    plt.grid(True, axis='y')
+    plt.savefig(path)
+    plt.close()
+
+
+_RENDERERS = {'house_edge': _render_house_edge, 'results': _render_results, 'pie': _render_pie, 'bar': _render_bar}
+
+
+#draws one chart, run in the worker processes
+def render_chart(path, kind, data):
+    _RENDERERS[kind](path, data)
+    return path
+
+
+#hash of everything a chart is drawn from
+def chart_hash(kind, data):
+    return hashlib.sha256(repr((CHART_VERSION, kind, data)).encode()).hexdigest()
+
+
+#charts from the cell summaries, only charts whose data changed since the last run (or whose file is missing) are redrawn
+def generate_charts(summaries, suffix='', output_dir='.', workers=None):
+    manifest_path = os.path.join(output_dir, CHART_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+    stale = []
+    for filename, kind, data in chart_specs(summaries, suffix):
+        path = os.path.join(output_dir, filename)
+        digest = chart_hash(kind, data)
+        if manifest.get(filename) != digest or not os.path.exists(path):
+            stale.append((path, kind, data))
+            manifest[filename] = digest
+
+    #a single chart is cheaper to draw here than to start a pool for
+    if len(stale) == 1:
+        render_chart(*stale[0])
+    elif stale:
+        workers = min(workers or os.cpu_count() or 1, len(stale))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_chart, path, kind, data) for path, kind, data in stale]
+            for future in futures:
+                future.result()
+
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    return [path for path, _, _ in stale]
+
+
+#function to format results into a string
+def format_results(results):
+    #formatted string from the results dictionary
+    formatted_results = (f"Wins: {results['wins']}, "
+                         f"Losses: {results['losses']}, "
+                         f"Ties: {results['ties']}, "
+                         f"Player Scores: {score_column(results, 'player')}, "
+                         f"Dealer Scores: {score_column(results, 'dealer')}")
+    return formatted_results
+
+
+#one side's scores, every one of them when the results keep them, otherwise (cached or parallel results)
+#each score once with its count
+def score_column(results, side):
+    if side + '_scores' in results:
+        return ', '.join(map(str, results[side + '_scores']))
+    return ', '.join(f"{score}x{count}" for score, count in enumerate(results[side + '_histogram']) if count)
+
+
+#save all results to a single CSV file with expanded headers
+def write_results_csv(results_data, filename):
+    with open(filename, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Strategy', 'Num_Decks', 'Wins', 'Losses', 'Ties', 'House Edge', 'Player Scores', 'Dealer Scores'])
+        writer.writerows(results_data)
+
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import time
+
+from engine import ENGINE_VERSION
+
+
+#hash of the compiled decision table, the rules, the deck count, the seed and the engine version,
+#so a strategy rewritten without changing a decision keeps its results and a changed engine or strategy never does
+def result_key(table, rules, num_decks, seed):
+    return hashlib.sha256(repr((ENGINE_VERSION, table.key(), rules.key(), num_decks, seed)).encode()).hexdigest()
+
+
+#ResultCache Class: simulation aggregates stored on disk under a hash of everything that decides them,
+#one small JSON file per entry, the least recently used entries are evicted once the cache outgrows max_bytes
+class ResultCache:
+
+    def __init__(self, directory='.result_cache', max_bytes=16 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    #the key an entry is stored under, see result_key
+    def key(self, table, rules, num_decks, seed):
+        return result_key(table, rules, num_decks, seed)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    #the entry stored under key, or None, marking it as just used
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+        return entry
+
+    #stores an entry, replacing the old file only once the new one is complete, then evicts down to max_bytes
+    def put(self, key, entry):
+        path = self._path(key)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(entry, file, separators=(',', ':'))
+        os.replace(temp_path, path)
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+        self.evict()
+
+    #removes the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, name in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            size -= entry_size
+
+    #total bytes on disk
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.directory, name))
+                   for name in os.listdir(self.directory) if name.endswith('.json'))
@@ -0,0 +1,99 @@
+import math
+import time
+
+from engine import REFERENCE_RULES, merge_results, results_edge_with_error, run_simulation
+
+
+#no cell is allocated as if its per-hand deviation were below this share of the pooled one,
+#so a pilot that happens to show no variance still gets trials
+DEVIATION_FLOOR = 0.5
+
+
+#AdaptiveScheduler Class: spends the CPU time of a hand budget across (strategy, num_decks) cells where it tightens
+#the results most, the budget is the time the hands would take split evenly across the cells
+class AdaptiveScheduler:
+
+    #cells are (strategy, num_decks) pairs, chunk is the most trials given to a cell between rebalances
+    def __init__(self, cells, hand_budget, rules=REFERENCE_RULES, chunk=None, pilot_fraction=0.2, ranking_weight=3.0):
+        if hand_budget < 2 * len(cells):
+            raise ValueError(f"hand_budget of {hand_budget} is too small for {len(cells)} cells")
+        self.cells = list(cells)
+        self.hand_budget = hand_budget
+        self.rules = rules
+        self.chunk = chunk if chunk is not None else max(hand_budget // (20 * len(self.cells)), 100)
+        #every cell gets an equal pilot share first, so each has a variance estimate to allocate from
+        self.pilot = max(int(hand_budget * pilot_fraction) // len(self.cells), 2)
+        self.ranking_weight = ranking_weight
+        self.results = {cell: None for cell in self.cells}
+        #CPU seconds spent on each cell, a cell with more decks to rebuild costs more per hand
+        self.seconds = {cell: 0.0 for cell in self.cells}
+
+    #runs more trials of a cell, timing them, and folds them into its results
+    def simulate(self, cell, num_trials):
+        strategy, num_decks = cell
+        start = time.process_time()
+        results = run_simulation(strategy, num_trials=num_trials, num_decks=num_decks, rules=self.rules)
+        self.seconds[cell] += time.process_time() - start
+        self.results[cell] = merge_results(self.results[cell], results)
+
+    #CPU seconds a hand of the cell takes so far
+    def cost(self, cell):
+        return max(self.seconds[cell], 1e-9) / self.trials(cell)
+
+    #CPU seconds the budget stands for: the hands split evenly across the cells, at each cell's cost
+    def cpu_budget(self):
+        return self.hand_budget / len(self.cells) * sum(self.cost(cell) for cell in self.cells)
+
+    def cpu_spent(self):
+        return sum(self.seconds.values())
+
+    #trials run so far for a cell
+    def trials(self, cell):
+        return self.results[cell]['rounds'] if self.results[cell] is not None else 0
+
+    #how unsure the ranking at this cell's deck count still is: close to 1 when another strategy's
+    #estimate is within the combined error, close to 0 once every gap is several errors wide
+    def ambiguity(self, cell, estimates):
+        house_edge, std_error = estimates[cell]
+        ambiguity = 0.0
+        for other, (other_edge, other_error) in estimates.items():
+            if other[1] == cell[1] and other != cell:
+                spread = std_error * std_error + other_error * other_error
+                if spread > 0:
+                    ambiguity = max(ambiguity, math.exp(-0.5 * (house_edge - other_edge) ** 2 / spread))
+        return ambiguity
+
+    #total trials each cell should end with: weighted Neyman allocation with costs, proportional to the per-hand
+    #standard deviation and the square root of the cell's importance for the ranking, and inversely to the square
+    #root of its cost per hand, scaled so the trials take the CPU budget
+    def allocation(self):
+        estimates = {cell: results_edge_with_error(self.results[cell]) for cell in self.cells}
+        deviations = {cell: estimates[cell][1] * math.sqrt(self.trials(cell)) for cell in self.cells}
+        pooled = math.sqrt(sum(self.trials(cell) * deviations[cell] ** 2 for cell in self.cells)
+                           / sum(self.trials(cell) for cell in self.cells))
+        scores = {}
+        for cell in self.cells:
+            importance = 1 + self.ranking_weight * self.ambiguity(cell, estimates)
+            scores[cell] = max(deviations[cell], DEVIATION_FLOOR * pooled) * math.sqrt(importance)
+        total = sum(scores[cell] * math.sqrt(self.cost(cell)) for cell in self.cells)
+        if total == 0:
+            return {cell: self.hand_budget / len(self.cells) for cell in self.cells}
+        return {cell: self.cpu_budget() * scores[cell] / math.sqrt(self.cost(cell)) / total for cell in self.cells}
+
+    #spends the whole CPU budget and returns each cell's merged run_simulation results
+    def run(self):
+        for cell in self.cells:
+            self.simulate(cell, self.pilot)
+        while self.cpu_spent() < self.cpu_budget():
+            #rebalanced after every chunk, as the estimates and costs (and so the allocation) converge
+            targets = self.allocation()
+            cell = max(self.cells, key=lambda cell: targets[cell] - self.trials(cell))
+            remaining = (self.cpu_budget() - self.cpu_spent()) / self.cost(cell)
+            self.simulate(cell, max(min(self.chunk, int(remaining)), 1))
+        return self.results
+
+
+#runs every strategy against every deck count within a total hand budget and returns {(strategy, num_decks): results}
+def run_adaptive_sweep(strategies, num_decks_list, hand_budget, rules=REFERENCE_RULES):
+    cells = [(strategy, num_decks) for strategy in strategies for num_decks in num_decks_list]
+    return AdaptiveScheduler(cells, hand_budget, rules).run()
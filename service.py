@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from engine import (REFERENCE_RULES, REFERENCE_SPLIT_RULES, DecisionTable, Engine, Rules, house_edge_with_error,
+                    simulate_aggregates)
+from result_cache import result_key
+from strategies import STRATEGIES
+
+
+#strategies the service can be asked about, by name
+STRATEGIES_BY_NAME = {strategy.__name__: strategy for strategy in STRATEGIES}
+
+#rule sets the service can be started with, by name, the reference ones are what main.py and
+#blackjack_with_split.py report under
+RULE_SETS = {'reference': REFERENCE_RULES, 'split': REFERENCE_SPLIT_RULES, 'casino': Rules()}
+
+#standard error (in house edge percentage points) a query asks for when it gives none
+DEFAULT_PRECISION = 0.5
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+#runs a chunk of trials in a worker process and returns only the aggregates, never the score lists
+def simulate_chunk(strategy_name, num_decks, num_trials, rules):
+    results = simulate_aggregates(Engine(STRATEGIES_BY_NAME[strategy_name], num_decks, rules), num_trials)
+    return {key: results[key] for key in ('wins', 'losses', 'ties', 'net', 'net_squared', 'rounds')}
+
+
+#adds the aggregates of a new chunk to an existing estimate
+def merge_aggregates(total, chunk):
+    if total is None:
+        return dict(chunk)
+    return {key: total[key] + chunk[key] for key in total}
+
+
+#EdgeService Class: answers house edge queries from a cache that is refined in the background
+class EdgeService:
+
+    def __init__(self, cache_path='edge_cache.json', rules=None, workers=None,
+                 min_chunk=10000, max_chunk=200000, max_trials=20000000):
+        self.cache_path = cache_path
+        #the rules main.py reports under unless told otherwise, so the service gives the same numbers
+        self.rules = rules if rules is not None else REFERENCE_RULES
+        self.workers = workers
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.max_trials = max_trials
+        #(strategy name, num_decks) -> aggregates of every trial run so far
+        self.estimates = {}
+        #(strategy name, num_decks) -> tightest precision asked for, and the task refining towards it
+        self.targets = {}
+        self.refiners = {}
+        self.first_runs = {}
+        self.pool = None
+        self.server = None
+        #saves run in the default executor one at a time, two writers would clobber each other's file
+        self.save_lock = asyncio.Lock()
+        #each strategy compiled under the rules, what its cache entries are keyed by
+        self.tables = {name: DecisionTable(strategy, self.rules) for name, strategy in STRATEGIES_BY_NAME.items()}
+        self.load()
+
+    #cache entries are keyed like result_cache.py, so they are only valid for the rules, the strategy's decisions
+    #and the engine version they were simulated under
+    def _cache_key(self, key):
+        return result_key(self.tables[key[0]], self.rules, key[1], None)
+
+    #loads the on-disk cache, ignoring entries simulated under other rules, decisions or engine versions
+    def load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path) as file:
+            saved = json.load(file)
+        for cache_key, entry in saved.items():
+            if not isinstance(entry, dict) or entry.get('strategy') not in self.tables:
+                continue
+            key = (entry['strategy'], entry['num_decks'])
+            if self._cache_key(key) == cache_key:
+                self.estimates[key] = entry['aggregates']
+
+    #the cache entries for the current estimates, taken on the event loop so writing them can happen elsewhere
+    def entries(self):
+        return {self._cache_key(key): {'strategy': key[0], 'num_decks': key[1], 'aggregates': dict(aggregates)}
+                for key, aggregates in sorted(self.estimates.items())}
+
+    #writes the cache to disk, replacing the old file only once the new one is complete
+    def save(self, entries=None):
+        saved = {}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path) as file:
+                saved = json.load(file)
+        saved.update(entries if entries is not None else self.entries())
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        descriptor, temp_path = tempfile.mkstemp(prefix=os.path.basename(self.cache_path) + '.', suffix='.tmp',
+                                                 dir=directory)
+        try:
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(saved, file)
+            os.replace(temp_path, self.cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    #saves the current estimates off the event loop, waiting for any save already running
+    async def save_in_background(self):
+        async with self.save_lock:
+            await asyncio.get_running_loop().run_in_executor(None, self.save, self.entries())
+
+    #returns the answer for a cell from its current estimate
+    def describe(self, key, precision):
+        aggregates = self.estimates[key]
+        house_edge, std_error = house_edge_with_error(
+            aggregates['wins'], aggregates['losses'], aggregates['ties'],
+            aggregates['net'], aggregates['net_squared'], aggregates['rounds'])
+        return {'strategy': key[0], 'num_decks': key[1], 'house_edge': house_edge, 'std_error': std_error,
+                'trials': aggregates['rounds'], 'precision': precision,
+                'converged': std_error <= precision or aggregates['rounds'] >= self.max_trials,
+                'refining': key in self.refiners, 'rules': repr(self.rules)}
+
+    #number of trials for the next chunk, enough to reach the target if the variance estimate holds
+    def _next_chunk(self, key):
+        aggregates = self.estimates.get(key)
+        if aggregates is None:
+            return self.min_chunk
+        house_edge, std_error = house_edge_with_error(
+            aggregates['wins'], aggregates['losses'], aggregates['ties'],
+            aggregates['net'], aggregates['net_squared'], aggregates['rounds'])
+        needed = aggregates['rounds'] * (std_error / self.targets[key]) ** 2 - aggregates['rounds']
+        return int(min(max(needed, self.min_chunk), self.max_chunk, self.max_trials - aggregates['rounds']))
+
+    def _converged(self, key):
+        return self.describe(key, self.targets[key])['converged']
+
+    #runs one chunk in the process pool and folds it into the estimate
+    async def _simulate(self, key):
+        loop = asyncio.get_running_loop()
+        chunk = await loop.run_in_executor(self.pool, simulate_chunk, key[0], key[1], self._next_chunk(key), self.rules)
+        self.estimates[key] = merge_aggregates(self.estimates.get(key), chunk)
+
+    #keeps adding chunks until the tightest precision asked for is reached, saving after each one
+    async def _refine(self, key):
+        try:
+            while not self._converged(key):
+                await self._simulate(key)
+                #shielded, so stopping the service never abandons a save half written
+                await asyncio.shield(self.save_in_background())
+        finally:
+            del self.refiners[key]
+
+    #answers a query: cached estimates are returned at once and refined in the background if not precise enough
+    async def query(self, strategy_name, num_decks, precision=DEFAULT_PRECISION):
+        key = (strategy_name, num_decks)
+        self.targets[key] = min(precision, self.targets.get(key, precision))
+        if key not in self.estimates:
+            #the first chunk is shared by every query that arrives while it runs
+            if key not in self.first_runs:
+                self.first_runs[key] = asyncio.create_task(self._simulate(key))
+                #removed by the task itself when it ends, a waiter that is cancelled leaves it running and shared
+                self.first_runs[key].add_done_callback(lambda task: self.first_runs.pop(key, None))
+            await asyncio.shield(self.first_runs[key])
+        if key not in self.refiners and not self._converged(key):
+            self.refiners[key] = asyncio.create_task(self._refine(key))
+        return self.describe(key, precision)
+
+    #parses and checks the query string of a /edge request
+    def _parse_query(self, query):
+        params = {name: values[-1] for name, values in parse_qs(query).items()}
+        strategy_name = params.get('strategy', '')
+        if strategy_name not in STRATEGIES_BY_NAME:
+            raise ValueError(f"unknown strategy {strategy_name!r}, expected one of {sorted(STRATEGIES_BY_NAME)}")
+        num_decks = int(params.get('num_decks', '1'))
+        if not 1 <= num_decks <= 16:
+            raise ValueError(f"num_decks must be between 1 and 16, got {num_decks}")
+        precision = float(params.get('precision', DEFAULT_PRECISION))
+        if not precision > 0:
+            raise ValueError(f"precision must be positive, got {precision}")
+        return strategy_name, num_decks, precision
+
+    #handles one HTTP connection: GET /edge?strategy=...&num_decks=...&precision=...
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if len(request_line) != 3:
+                status, body = 400, {'error': 'malformed request'}
+            elif request_line[0] != 'GET':
+                status, body = 405, {'error': 'only GET is supported'}
+            else:
+                url = urlsplit(request_line[1])
+                if url.path != '/edge':
+                    status, body = 404, {'error': f'no such path {url.path}'}
+                else:
+                    try:
+                        query = self._parse_query(url.query)
+                    except ValueError as error:
+                        status, body = 400, {'error': str(error)}
+                    else:
+                        #a failed simulation (a worker crashing, say) is reported to the client, not just logged
+                        try:
+                            status, body = 200, await self.query(*query)
+                        except Exception as error:
+                            status, body = 500, {'error': f'{type(error).__name__}: {error}'}
+            payload = json.dumps(body).encode()
+            writer.write(f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                         f"Content-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    #starts the process pool and listens on host:port (port 0 picks a free port)
+    async def start(self, host='127.0.0.1', port=8765):
+        #spawned workers, a forked worker would inherit open client sockets and keep connections from closing
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    #stops listening, cancels background refinement and shuts the pool down
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        tasks = list(self.refiners.values()) + list(self.first_runs.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        #the final save waits for a save a cancelled refiner left running
+        async with self.save_lock:
+            self.save()
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(host, port, cache_path, workers, rules=REFERENCE_RULES):
+    service = EdgeService(cache_path, rules, workers)
+    port = await service.start(host, port)
+    print(f"Serving house edge queries on http://{host}:{port}/edge")
+    try:
+        await service.server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local house edge query service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache', default='edge_cache.json')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rules', default='reference', choices=sorted(RULE_SETS),
+                        help="rules to answer under, reference is the game main.py reports on")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.cache, args.workers, RULE_SETS[args.rules]))
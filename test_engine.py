@@ -0,0 +1,91 @@
+import contextlib
+import io
+import random
+import unittest
+
+import blackjack_with_split
+import main
+from cards import RANKS
+from engine import Engine, REFERENCE_RULES, REFERENCE_SPLIT_RULES, Rules, run_simulation
+from strategies import basic_strategy
+
+
+#!!To run: run "python -m unittest test_engine.py" in terminal
+
+
+#stacks the shoe so the given ranks are dealt in order (player, player, dealer up, dealer hole, then draws)
+def stack_shoe(engine, ranks):
+    filler = [RANKS.index('2')] * len(engine.full_shoe)
+    engine.shoe[:] = filler + [RANKS.index(rank) for rank in reversed(ranks)]
+
+
+class TestRules(unittest.TestCase):
+    def test_invalid_rules_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Rules(penetration=1.0)
+        with self.assertRaises(ValueError):
+            Rules(max_splits=-1)
+
+    def test_rules_compare_by_value(self):
+        self.assertEqual(Rules(blackjack_payout=1.2), Rules(blackjack_payout=1.2))
+        self.assertNotEqual(Rules(), Rules(dealer_hits_soft_17=True))
+        self.assertEqual(len({Rules(), Rules()}), 1)
+
+
+class TestEngine(unittest.TestCase):
+    def test_reference_rules_match_game(self):
+        #the same seed gives the same shuffle, so every round must end exactly as in main.Game
+        for seed in range(200):
+            random.seed(seed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                game = main.Game(basic_strategy, 2)
+                result = game.play_round()
+            random.seed(seed)
+            outcomes, net, player_score, dealer_score = Engine(basic_strategy, 2, REFERENCE_RULES).play_round()
+            self.assertEqual(outcomes, [result])
+            self.assertEqual(player_score, game.player.total_score)
+            self.assertEqual(dealer_score, game.dealer.total_score)
+
+    def test_blackjack_payout(self):
+        for payout in (1.5, 1.2):
+            engine = Engine(basic_strategy, 1, Rules(blackjack_payout=payout))
+            stack_shoe(engine, ['Ace', 'King', '9', '7'])
+            self.assertEqual(engine.play_round(), (['wins'], payout, 21, 16))
+
+    def test_dealer_soft_17(self):
+        #player stands on 18, dealer shows Ace-6 and draws a 3 only when hitting soft 17
+        for hits_soft_17, outcome in ((False, 'wins'), (True, 'losses')):
+            engine = Engine(basic_strategy, 1, Rules(dealer_hits_soft_17=hits_soft_17))
+            stack_shoe(engine, ['10', '8', 'Ace', '6', '3'])
+            self.assertEqual(engine.play_round()[0], [outcome])
+
+    def test_split_and_double_after_split(self):
+        def split_eights(game, hand, dealer):
+            if [card.rank for card in hand.cards] == ['8', '8']:
+                return 'split'
+            if hand.total_score == 11:
+                return 'double'
+            return 'hit' if hand.total_score < 17 else 'stand'
+
+        #8,8 against 6/King: split hands get 3 and 10, the 11 doubles (or hits) into 21 and the dealer busts
+        for das, net in ((True, 3.0), (False, 2.0)):
+            engine = Engine(split_eights, 1, Rules(double_after_split=das))
+            stack_shoe(engine, ['8', '8', '6', 'King', '3', '10', 'Queen', '10'])
+            self.assertEqual(engine.play_round(), (['wins', 'wins'], net, 21, 26))
+
+    def test_run_simulation_counts_every_round(self):
+        results = run_simulation(basic_strategy, num_trials=500, num_decks=6, rules=Rules())
+        self.assertEqual(len(results['player_scores']), 500)
+        self.assertGreaterEqual(results['wins'] + results['losses'] + results['ties'], 500)
+
+    def test_run_simulation_defaults_to_the_game_rules(self):
+        for module, rules in ((main, REFERENCE_RULES), (blackjack_with_split, REFERENCE_SPLIT_RULES)):
+            with self.subTest(module=module.__name__):
+                self.assertEqual(module.run_simulation(basic_strategy, 300, 6, seed=2),
+                                 run_simulation(basic_strategy, 300, 6, rules, seed=2))
+                self.assertNotEqual(module.run_simulation(basic_strategy, 300, 6, seed=2),
+                                    run_simulation(basic_strategy, 300, 6, Rules(), seed=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import unittest
+from collections import Counter
+
+import blackjack_with_split
+import main
+from engine import Engine, REFERENCE_RULES, REFERENCE_SPLIT_RULES
+from equivalence import (ALPHA, SAMPLE_ROUNDS, SEEDED_ROUNDS, chi_square_homogeneity, compare_samples, engine_sample,
+                         histogram_sample, reference_sample, seeded_mismatches, split_pairs, z_test_net)
+from hand_trace import TraceRecorder
+from parallel import run_parallel_simulation
+from strategies import STRATEGIES, basic_strategy, conservative_strategy
+
+
+#!!To run: run "python -m unittest test_equivalence.py" in terminal
+#set EQUIVALENCE_FAST=1 for the small samples used in CI
+
+
+#plays one seeded round through an Engine that records it, the recorder must not change the result
+def recorded_round(strategy, num_decks, rules, seed):
+    random.seed(seed)
+    outcomes, net, player_score, dealer_score = Engine(strategy, num_decks, rules, recorder=TraceRecorder(16)).play_round()
+    return outcomes, player_score, dealer_score
+
+
+class TestSeededEquivalence(unittest.TestCase):
+    def test_engine_matches_game(self):
+        for strategy in STRATEGIES:
+            for num_decks in (1, 6):
+                with self.subTest(strategy=strategy.__name__, num_decks=num_decks):
+                    self.assertEqual(seeded_mismatches(main.Game, strategy, num_decks, REFERENCE_RULES,
+                                                       range(SEEDED_ROUNDS)), [])
+
+    def test_engine_matches_split_game(self):
+        for strategy in (split_pairs, basic_strategy):
+            with self.subTest(strategy=strategy.__name__):
+                self.assertEqual(seeded_mismatches(blackjack_with_split.Game, strategy, 1, REFERENCE_SPLIT_RULES,
+                                                   range(SEEDED_ROUNDS)), [])
+
+    def test_recording_engine_matches_game(self):
+        self.assertEqual(seeded_mismatches(blackjack_with_split.Game, split_pairs, 2, REFERENCE_SPLIT_RULES,
+                                           range(SEEDED_ROUNDS), recorded_round), [])
+
+
+class TestDistributionEquivalence(unittest.TestCase):
+    def assertEquivalent(self, reference, candidate):
+        for name, p_value in compare_samples(reference, candidate).items():
+            self.assertGreater(p_value, ALPHA, f"{name} distributions differ")
+
+    def test_engine_distribution(self):
+        reference = reference_sample(main.Game, basic_strategy, 6, SAMPLE_ROUNDS)
+        self.assertEquivalent(reference, engine_sample(basic_strategy, 6, REFERENCE_RULES, SAMPLE_ROUNDS, seed=1))
+
+    def test_split_engine_distribution(self):
+        reference = reference_sample(blackjack_with_split.Game, split_pairs, 1, SAMPLE_ROUNDS)
+        self.assertEquivalent(reference, engine_sample(split_pairs, 1, REFERENCE_SPLIT_RULES, SAMPLE_ROUNDS, seed=1))
+
+    def test_parallel_distribution(self):
+        reference = reference_sample(main.Game, basic_strategy, 2, SAMPLE_ROUNDS)
+        results = run_parallel_simulation(basic_strategy, SAMPLE_ROUNDS, 2, REFERENCE_RULES, workers=2, seed=1)
+        self.assertEquivalent(reference, histogram_sample(results))
+
+    def test_a_different_strategy_is_detected(self):
+        reference = reference_sample(main.Game, basic_strategy, 1, SAMPLE_ROUNDS)
+        candidate = engine_sample(conservative_strategy, 1, REFERENCE_RULES, SAMPLE_ROUNDS, seed=1)
+        self.assertLess(min(compare_samples(reference, candidate).values()), ALPHA)
+
+
+class TestStatistics(unittest.TestCase):
+    def test_chi_square_matches_tables(self):
+        #50/50 against 70/30 with 100 each: statistic 8.33 on 1 degree of freedom, p = 0.0039
+        statistic, dof, p_value = chi_square_homogeneity(Counter(a=50, b=50), Counter(a=70, b=30))
+        self.assertEqual(dof, 1)
+        self.assertAlmostEqual(statistic, 8.3333, places=3)
+        self.assertAlmostEqual(p_value, 0.00389, places=4)
+
+    def test_rare_categories_are_pooled(self):
+        statistic, dof, p_value = chi_square_homogeneity(Counter(a=500, b=500, c=1, d=2), Counter(a=500, b=500, d=1))
+        self.assertEqual(dof, 2)
+
+    def test_identical_samples_pass(self):
+        sample = engine_sample(basic_strategy, 1, REFERENCE_RULES, 500)
+        self.assertEqual(compare_samples(sample, sample), {'outcomes': 1.0, 'player_totals': 1.0,
+                                                           'dealer_totals': 1.0, 'net': 1.0})
+        self.assertEqual(z_test_net(sample, sample)[0], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
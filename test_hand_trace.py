@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from engine import Engine, REFERENCE_RULES, REFERENCE_SPLIT_RULES, Rules
+from equivalence import split_pairs
+from hand_trace import NATURAL, TraceRecorder, read_header, read_trace, replay, replay_engine, replay_game
+from strategies import basic_strategy
+
+
+#!!To run: run "python -m unittest test_hand_trace.py" in terminal
+
+
+class TestTraceRecorder(unittest.TestCase):
+    def test_ring_buffer_keeps_the_latest_rounds(self):
+        recorder = TraceRecorder(capacity=100)
+        engine = Engine(basic_strategy, 6, Rules(), recorder=recorder)
+        played = [engine.play_round() for _ in range(250)]
+        records = recorder.records()
+        self.assertEqual([record.round_number for record in records], list(range(150, 250)))
+        for record, (outcomes, net, player_score, dealer_score) in zip(records, played[150:]):
+            self.assertEqual(list(record.outcomes), outcomes)
+            self.assertAlmostEqual(record.net, net, places=5)
+            self.assertEqual((record.player_score, record.dealer_total), (player_score, dealer_score))
+            self.assertEqual(len(record.cards), record.num_cards)
+
+    def test_split_rounds_replay_through_game(self):
+        recorder = TraceRecorder(capacity=2000)
+        engine = Engine(split_pairs, 1, REFERENCE_SPLIT_RULES, recorder=recorder)
+        for _ in range(2000):
+            engine.play_round()
+        split_rounds = [record for record in recorder.records() if len(record.outcomes) == 2]
+        self.assertTrue(split_rounds)
+        for record in split_rounds:
+            outcomes, narration = replay_game(record, split_pairs, split=True)
+            self.assertEqual(outcomes, list(record.outcomes))
+            self.assertIn("Player splits!", narration)
+
+    def test_file_trace_replays_through_engine(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.bin')
+            recorder = TraceRecorder(path=path)
+            rules = Rules(blackjack_payout=1.2)
+            engine = Engine(basic_strategy, 2, rules, recorder=recorder)
+            for _ in range(500):
+                engine.play_round()
+            recorder.close()
+            records = read_trace(path)
+            self.assertEqual(len(records), 500)
+            for record in records:
+                outcomes, net, player_score, dealer_score = replay_engine(record, basic_strategy, rules)
+                self.assertEqual(outcomes, list(record.outcomes))
+                self.assertAlmostEqual(net, record.net, places=5)
+            naturals = [record for record in records if record.hand_flags == (NATURAL,) and record.outcomes == ('wins',)]
+            self.assertTrue(all(abs(record.net - 1.2) < 1e-6 for record in naturals))
+
+    def test_header_says_how_the_trace_was_made(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.bin')
+            recorder = TraceRecorder(path=path)
+            engine = Engine(basic_strategy, 6, Rules(), recorder=recorder)
+            for _ in range(2000):
+                engine.play_round()
+            recorder.close()
+            header = read_header(path)
+            self.assertEqual(header, (Rules(), 'basic_strategy', 6))
+            records = read_trace(path)
+            self.assertEqual(len(records), 2000)
+            #Game plays neither naturals nor the dealer peek, so these rounds are replayed through the engine
+            for record in records:
+                outcomes, narration, replayed_by = replay(record, basic_strategy, header.rules)
+                self.assertEqual((outcomes, replayed_by), (list(record.outcomes), 'Engine'))
+            self.assertEqual(replay(records[0], basic_strategy, REFERENCE_RULES)[2], 'main.Game')
+
+    def test_replay_tool_rejects_unknown_rounds(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.bin')
+            recorder = TraceRecorder(path=path)
+            engine = Engine(basic_strategy, 1, REFERENCE_RULES, recorder=recorder)
+            for _ in range(10):
+                engine.play_round()
+            recorder.close()
+            tool = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hand_trace.py')
+            replayed = subprocess.run([sys.executable, tool, path, '3'], capture_output=True, text=True)
+            self.assertEqual(replayed.returncode, 0)
+            self.assertIn('replayed through main.Game', replayed.stdout)
+            self.assertNotIn('DIFFERS', replayed.stdout)
+            missing = subprocess.run([sys.executable, tool, path, '10'], capture_output=True, text=True)
+            self.assertEqual(missing.returncode, 2)
+            self.assertIn('round 10 is not in the trace', missing.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from engine import REFERENCE_RULES, REFERENCE_SPLIT_RULES, Rules, results_edge_with_error
+from equivalence import split_pairs
+from infinite_deck import InfiniteDeckAnalysis, InfiniteDeckEngine, exact_analysis, run_infinite_simulation
+from strategies import basic_strategy, conservative_strategy
+
+
+#!!To run: run "python -m unittest test_infinite_deck.py" in terminal
+
+
+class TestInfiniteDeckEngine(unittest.TestCase):
+    def test_cards_come_in_batches(self):
+        engine = InfiniteDeckEngine(basic_strategy, Rules(), seed=1, batch=1000)
+        for _ in range(3000):
+            engine.play_round()
+        #five or six cards a round
+        self.assertGreater(engine.shuffles, 10)
+        self.assertLess(engine.shuffles, 25)
+
+    def test_seed_makes_runs_repeatable(self):
+        first = run_infinite_simulation(basic_strategy, 3000, Rules(), seed=4)
+        second = run_infinite_simulation(basic_strategy, 3000, Rules(), seed=4)
+        self.assertEqual(first, second)
+
+    def test_defaults_to_the_game_rules(self):
+        self.assertEqual(run_infinite_simulation(basic_strategy, 300, seed=2),
+                         run_infinite_simulation(basic_strategy, 300, REFERENCE_RULES, seed=2))
+        self.assertEqual(exact_analysis(basic_strategy), exact_analysis(basic_strategy, REFERENCE_RULES))
+        self.assertNotEqual(exact_analysis(basic_strategy), exact_analysis(basic_strategy, Rules()))
+
+
+class TestExactAnalysis(unittest.TestCase):
+    def test_dealer_soft_17(self):
+        self.assertEqual(InfiniteDeckAnalysis(basic_strategy, Rules()).dealer_totals(17, 1), {17: 1.0})
+        hits_soft_17 = InfiniteDeckAnalysis(basic_strategy, Rules(dealer_hits_soft_17=True)).dealer_totals(17, 1)
+        self.assertLess(hits_soft_17[17], 0.5)
+        self.assertAlmostEqual(sum(hits_soft_17.values()), 1.0)
+
+    def test_one_hand_a_round_without_splits(self):
+        exact = exact_analysis(conservative_strategy, REFERENCE_RULES)
+        self.assertAlmostEqual(exact['wins'] + exact['losses'] + exact['ties'], 1.0)
+        self.assertAlmostEqual(exact['net'], exact['wins'] - exact['losses'])
+
+    def test_sampled_edges_agree(self):
+        for strategy, rules in ((basic_strategy, Rules()), (basic_strategy, Rules(surrender=True, dealer_hits_soft_17=True)),
+                                (split_pairs, REFERENCE_SPLIT_RULES)):
+            with self.subTest(strategy=strategy.__name__, rules=rules):
+                exact = exact_analysis(strategy, rules)
+                house_edge, std_error = results_edge_with_error(run_infinite_simulation(strategy, 200000, rules, seed=2))
+                self.assertLess(abs(house_edge - exact['house_edge']), 4 * std_error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from engine import REFERENCE_RULES, Rules
+from parallel import SharedAccumulators, run_parallel_simulation
+from strategies import basic_strategy
+
+
+#!!To run: run "python -m unittest test_parallel.py" in terminal
+
+
+class TestSharedAccumulators(unittest.TestCase):
+    def test_rows_are_summed(self):
+        accumulators = SharedAccumulators(2)
+        try:
+            attached = SharedAccumulators(2, accumulators.name)
+            histogram = [0] * 32
+            histogram[20] = 3
+            attached.publish(1, 1, 2, 0, 3, -1.0, 3.0, histogram, histogram)
+            attached.close()
+            totals = accumulators.totals()
+            self.assertEqual((totals['wins'], totals['losses'], totals['rounds'], totals['net']), (1, 2, 3, -1.0))
+            self.assertEqual(totals['player_histogram'][20], 3)
+        finally:
+            accumulators.close()
+            accumulators.unlink()
+
+
+class TestParallelSimulation(unittest.TestCase):
+    def test_totals_cover_every_round(self):
+        seen = []
+        results = run_parallel_simulation(basic_strategy, num_trials=5001, num_decks=6, rules=Rules(),
+                                          workers=2, seed=7, progress=seen.append, progress_interval=0.05)
+        self.assertEqual(results['rounds'], 5001)
+        self.assertEqual(results['player_histogram'].sum(), 5001)
+        self.assertEqual(results['dealer_histogram'].sum(), 5001)
+        self.assertGreaterEqual(results['wins'] + results['losses'] + results['ties'], 5001)
+        self.assertTrue(seen)
+        self.assertEqual(seen[-1]['rounds'], 5001)
+
+    def test_seed_makes_runs_repeatable(self):
+        first = run_parallel_simulation(basic_strategy, num_trials=2000, num_decks=2, rules=Rules(), workers=2, seed=3)
+        second = run_parallel_simulation(basic_strategy, num_trials=2000, num_decks=2, rules=Rules(), workers=2, seed=3)
+        self.assertEqual((first['wins'], first['losses'], first['net']), (second['wins'], second['losses'], second['net']))
+
+    def test_defaults_to_the_game_rules(self):
+        default = run_parallel_simulation(basic_strategy, num_trials=2000, num_decks=2, workers=2, seed=3)
+        reference = run_parallel_simulation(basic_strategy, num_trials=2000, num_decks=2, rules=REFERENCE_RULES,
+                                            workers=2, seed=3)
+        self.assertEqual((default['wins'], default['losses'], default['net']),
+                         (reference['wins'], reference['losses'], reference['net']))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+from reporting import CellSummary, generate_charts
+
+
+#!!To run: run "python -m unittest test_reporting.py" in terminal
+
+
+SUMMARIES = [CellSummary('basic_strategy', 1, 420, 480, 100, 6.0),
+             CellSummary('basic_strategy', 2, 410, 490, 100, 8.0),
+             CellSummary('aggressive_strategy', 1, 400, 520, 80, 12.0),
+             CellSummary('aggressive_strategy', 2, 395, 525, 80, 13.0)]
+
+
+class TestGenerateCharts(unittest.TestCase):
+    def test_only_stale_charts_are_redrawn(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            rendered = generate_charts(SUMMARIES, output_dir=output_dir, workers=2)
+            names = sorted(os.path.basename(path) for path in rendered)
+            self.assertEqual(names, ['aggressive_strategy_results.png', 'bar_chart.png', 'basic_strategy_results.png',
+                                     'house_edge_comparison.png', 'pie_charts.png'])
+            for name in names:
+                self.assertTrue(os.path.exists(os.path.join(output_dir, name)))
+
+            #nothing changed, nothing is drawn
+            self.assertEqual(generate_charts(SUMMARIES, output_dir=output_dir), [])
+
+            #a change to one aggressive cell leaves the basic strategy chart alone
+            changed = SUMMARIES[:3] + [CellSummary('aggressive_strategy', 2, 396, 524, 80, 12.8)]
+            names = sorted(os.path.basename(path) for path in generate_charts(changed, output_dir=output_dir))
+            self.assertEqual(names, ['aggressive_strategy_results.png', 'bar_chart.png',
+                                     'house_edge_comparison.png', 'pie_charts.png'])
+
+            #a deleted file is drawn again
+            os.remove(os.path.join(output_dir, 'basic_strategy_results.png'))
+            rendered = generate_charts(changed, output_dir=output_dir)
+            self.assertEqual([os.path.basename(path) for path in rendered], ['basic_strategy_results.png'])
+
+
+if __name__ == "__main__":
+    unittest.main()
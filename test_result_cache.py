@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import main
+from engine import DecisionTable, Rules, merge_results, results_edge_with_error, run_simulation
+from reporting import format_results
+from result_cache import ResultCache
+from strategies import aggressive_strategy, basic_strategy
+
+
+#!!To run: run "python -m unittest test_result_cache.py" in terminal
+
+
+#basic_strategy written differently, every decision is the same so it compiles to the same table
+def reworded_basic_strategy(game, player, dealer):
+    return basic_strategy(game, player, dealer)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_repeat_run_is_served_from_the_cache(self):
+        first = run_simulation(basic_strategy, 2000, 6, Rules(), seed=5, cache=self.cache)
+        #a different strategy function making the same decisions hits the same entry
+        second = run_simulation(reworded_basic_strategy, 2000, 6, Rules(), seed=5, cache=self.cache)
+        self.assertEqual(first, second)
+        self.assertEqual(first['rounds'], 2000)
+        self.assertEqual(sum(first['player_histogram']), 2000)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+        uncached = run_simulation(basic_strategy, 2000, 6, Rules(), seed=5)
+        self.assertEqual((first['wins'], first['losses'], first['net']),
+                         (uncached['wins'], uncached['losses'], uncached['net']))
+
+    def test_top_up_continues_the_seeded_run(self):
+        run_simulation(basic_strategy, 700, 1, Rules(), seed=9, cache=self.cache)
+        topped_up = run_simulation(basic_strategy, 2500, 1, Rules(), seed=9, cache=self.cache)
+        with tempfile.TemporaryDirectory() as directory:
+            fresh = run_simulation(basic_strategy, 2500, 1, Rules(), seed=9, cache=ResultCache(directory))
+        self.assertEqual(topped_up, fresh)
+        #asking for fewer trials replays them from the seed and leaves the longer cached run alone
+        fewer = run_simulation(basic_strategy, 100, 1, Rules(), seed=9, cache=self.cache)
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(fewer, run_simulation(basic_strategy, 100, 1, Rules(), seed=9, cache=ResultCache(directory)))
+        self.assertEqual(run_simulation(basic_strategy, 2500, 1, Rules(), seed=9, cache=self.cache), topped_up)
+
+    def test_cached_results_have_the_uncached_aggregates(self):
+        cached = run_simulation(basic_strategy, 1000, 2, Rules(), seed=3, cache=self.cache)
+        uncached = run_simulation(basic_strategy, 1000, 2, Rules(), seed=3)
+        self.assertEqual(cached, {key: value for key, value in uncached.items() if not key.endswith('_scores')})
+        self.assertEqual(results_edge_with_error(cached), results_edge_with_error(uncached))
+        self.assertIn('20x', format_results(cached))
+        self.assertEqual(merge_results(dict(cached), cached)['rounds'], 2000)
+        with self.assertRaises(ValueError):
+            merge_results(uncached, cached)
+
+    def test_main_rejects_a_cache_with_a_hand_budget(self):
+        with self.assertRaises(ValueError):
+            main.main(hand_budget=1000, cache=self.cache)
+
+    def test_key_covers_every_input(self):
+        table = DecisionTable(basic_strategy, Rules())
+        key = self.cache.key(table, Rules(), 6, 1)
+        self.assertNotEqual(key, self.cache.key(DecisionTable(aggressive_strategy, Rules()), Rules(), 6, 1))
+        self.assertNotEqual(key, self.cache.key(table, Rules(dealer_hits_soft_17=True), 6, 1))
+        self.assertNotEqual(key, self.cache.key(table, Rules(), 8, 1))
+        self.assertNotEqual(key, self.cache.key(table, Rules(), 6, 2))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        entry = {'results': {'rounds': 1}, 'state': list(range(100))}
+        self.cache.put('a', entry)
+        entry_size = self.cache.size()
+        self.cache.max_bytes = 2 * entry_size
+        self.cache.put('b', entry)
+        self.assertIsNotNone(self.cache.get('a'))
+        self.cache.put('c', entry)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), entry)
+        self.assertIsNotNone(self.cache.get('c'))
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
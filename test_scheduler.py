@@ -0,0 +1,85 @@
+import unittest
+
+from engine import REFERENCE_RULES, results_edge_with_error
+from scheduler import AdaptiveScheduler
+from strategies import aggressive_strategy, basic_strategy
+
+
+#!!To run: run "python -m unittest test_scheduler.py" in terminal
+
+
+#results of 100 even rounds won or lost for the given stake, so the per-round deviation is the stake
+def even_results(stake):
+    return {'wins': 50, 'losses': 50, 'ties': 0, 'rounds': 100, 'player_scores': [20] * 100,
+            'dealer_scores': [20] * 100, 'net': 0.0, 'net_squared': 100.0 * stake * stake}
+
+
+#sets every cell's timing as if each of its hands took the given seconds
+def set_costs(scheduler, costs):
+    for cell, cost in zip(scheduler.cells, costs):
+        scheduler.seconds[cell] = cost * scheduler.trials(cell)
+
+
+class TestAdaptiveScheduler(unittest.TestCase):
+    def test_allocation_follows_deviation_and_ranking(self):
+        cells = [(basic_strategy, 1), (basic_strategy, 2), (aggressive_strategy, 2)]
+        scheduler = AdaptiveScheduler(cells, 3000)
+        scheduler.results = {cells[0]: even_results(1), cells[1]: even_results(2), cells[2]: even_results(2)}
+        set_costs(scheduler, [1e-5, 1e-5, 1e-5])
+        #cells 1 and 2 share a deck count and have the same estimate, so their ranking is unresolved
+        targets = scheduler.allocation()
+        self.assertAlmostEqual(targets[cells[1]] / targets[cells[0]], 2 * (1 + scheduler.ranking_weight) ** 0.5)
+        self.assertAlmostEqual(sum(targets.values()), 3000)
+
+        #once they are far apart only the deviation matters
+        scheduler.results[cells[2]]['net'] = -100.0
+        targets = scheduler.allocation()
+        self.assertAlmostEqual(targets[cells[1]] / targets[cells[0]], 2, places=2)
+
+    def test_allocation_follows_cost(self):
+        cells = [(basic_strategy, 1), (basic_strategy, 8)]
+        scheduler = AdaptiveScheduler(cells, 3000, ranking_weight=0.0)
+        scheduler.results = {cells[0]: even_results(1), cells[1]: even_results(1)}
+        #a hand four times as costly gets half as many trials, and the trials take the CPU of 3000 even hands
+        set_costs(scheduler, [1e-5, 4e-5])
+        targets = scheduler.allocation()
+        self.assertAlmostEqual(targets[cells[0]] / targets[cells[1]], 2)
+        self.assertAlmostEqual(targets[cells[0]] * 1e-5 + targets[cells[1]] * 4e-5, 1500 * 1e-5 + 1500 * 4e-5)
+
+    def test_a_cell_without_variance_still_gets_trials(self):
+        cells = [(basic_strategy, 1), (basic_strategy, 2)]
+        scheduler = AdaptiveScheduler(cells, 3000, ranking_weight=0.0)
+        scheduler.results = {cells[0]: even_results(0), cells[1]: even_results(2)}
+        set_costs(scheduler, [1e-5, 1e-5])
+        self.assertGreater(scheduler.allocation()[cells[0]], 0)
+
+    def test_run_spends_the_cpu_budget(self):
+        cells = [(basic_strategy, 1), (aggressive_strategy, 1), (basic_strategy, 6)]
+        scheduler = AdaptiveScheduler(cells, 6000, REFERENCE_RULES, chunk=250)
+        results = scheduler.run()
+        self.assertEqual(sum(len(results[cell]['player_scores']) for cell in cells),
+                         sum(scheduler.trials(cell) for cell in cells))
+        self.assertGreaterEqual(scheduler.cpu_spent(), scheduler.cpu_budget())
+        for cell in cells:
+            self.assertGreaterEqual(scheduler.trials(cell), scheduler.pilot)
+
+    def test_tighter_than_an_even_split_of_the_same_cpu(self):
+        #8 decks cost several times more per hand than 1 under the reference rules, which rebuild the shoe every round
+        cells = [(basic_strategy, 1), (aggressive_strategy, 1), (basic_strategy, 8), (aggressive_strategy, 8)]
+        scheduler = AdaptiveScheduler(cells, 20000, REFERENCE_RULES, ranking_weight=0.0)
+        scheduler.run()
+        #per-hand variances as estimated, and the even split the same CPU time would have bought
+        variances = {cell: results_edge_with_error(scheduler.results[cell])[1] ** 2 * scheduler.trials(cell)
+                     for cell in cells}
+        even_trials = scheduler.cpu_spent() / sum(scheduler.cost(cell) for cell in cells)
+        adaptive = sum(variances[cell] / scheduler.trials(cell) for cell in cells)
+        even = sum(variances[cell] / even_trials for cell in cells)
+        self.assertLess(adaptive, even)
+
+    def test_budget_must_cover_the_cells(self):
+        with self.assertRaises(ValueError):
+            AdaptiveScheduler([(basic_strategy, 1), (basic_strategy, 2)], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from engine import REFERENCE_RULES
+import service as service_module
+from service import EdgeService
+from strategies import conservative_strategy
+
+
+#!!To run: run "python -m unittest test_service.py" in terminal
+
+
+#sends a GET request to the service on localhost and returns (status, decoded JSON body)
+async def get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body)
+
+
+class TestEdgeService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, 'edge_cache.json')
+        self.service = EdgeService(self.cache_path, workers=2, min_chunk=2000, max_chunk=20000)
+        self.port = await self.service.start(port=0)
+
+    async def asyncTearDown(self):
+        await self.service.stop()
+        self.directory.cleanup()
+
+    async def test_bad_queries(self):
+        status, body = await get(self.port, '/edge?strategy=card_counting&num_decks=6')
+        self.assertEqual(status, 400)
+        self.assertIn('unknown strategy', body['error'])
+        status, _ = await get(self.port, '/edge?strategy=basic_strategy&precision=0')
+        self.assertEqual(status, 400)
+        status, _ = await get(self.port, '/house_edge')
+        self.assertEqual(status, 404)
+
+    async def test_cancelled_waiter_leaves_the_first_run_shared(self):
+        key = ('basic_strategy', 6)
+        waiter = asyncio.create_task(self.service.query(*key, 1.5))
+        while key not in self.service.first_runs:
+            await asyncio.sleep(0)
+        first_run = self.service.first_runs[key]
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        self.assertIs(self.service.first_runs.get(key), first_run)
+        #the next query waits on the same run instead of starting another
+        answer = await self.service.query(*key, 1.5)
+        self.assertEqual(answer['trials'], 2000)
+        self.assertNotIn(key, self.service.first_runs)
+
+    async def test_failed_query_gets_a_500(self):
+        async def crash(*args):
+            raise RuntimeError('worker died')
+        self.service.query = crash
+        status, body = await get(self.port, '/edge?strategy=basic_strategy&num_decks=6')
+        self.assertEqual(status, 500)
+        self.assertEqual(body['error'], 'RuntimeError: worker died')
+
+    async def test_query_is_refined_in_background_and_cached(self):
+        path = '/edge?strategy=basic_strategy&num_decks=6&precision=1.5'
+        status, first = await get(self.port, path)
+        self.assertEqual(status, 200)
+        self.assertEqual(first['trials'], 2000)
+        self.assertEqual(first['rules'], repr(REFERENCE_RULES))
+
+        #the estimate keeps improving without anyone waiting on it
+        while self.service.refiners:
+            await asyncio.sleep(0.05)
+        status, second = await get(self.port, path)
+        self.assertTrue(second['converged'])
+        self.assertLessEqual(second['std_error'], 1.5)
+        self.assertGreater(second['trials'], first['trials'])
+
+        #a restarted service answers from the disk cache without simulating
+        await self.service.stop()
+        self.service = EdgeService(self.cache_path, workers=1, min_chunk=2000)
+        self.port = await self.service.start(port=0)
+        status, third = await get(self.port, path)
+        self.assertEqual(third['trials'], second['trials'])
+        self.assertFalse(third['refining'])
+
+
+class TestCacheFile(unittest.TestCase):
+    def test_concurrent_saves_each_write_a_whole_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, 'edge_cache.json')
+            service = EdgeService(cache_path)
+            service.estimates[('basic_strategy', 6)] = {'wins': 1, 'losses': 1, 'ties': 0, 'net': 0.0,
+                                                        'net_squared': 2.0, 'rounds': 2}
+            errors = []
+
+            def save_repeatedly():
+                try:
+                    for _ in range(25):
+                        service.save()
+                except OSError as error:
+                    errors.append(error)
+
+            threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(os.listdir(directory), ['edge_cache.json'])
+            reloaded = EdgeService(cache_path)
+            self.assertEqual(reloaded.estimates, service.estimates)
+
+    def test_stale_entries_are_not_served(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, 'edge_cache.json')
+            service = EdgeService(cache_path)
+            service.estimates[('basic_strategy', 6)] = {'wins': 1, 'losses': 1, 'ties': 0, 'net': 0.0,
+                                                        'net_squared': 2.0, 'rounds': 2}
+            service.save()
+            #a strategy whose decisions changed since the entry was simulated
+            with mock.patch.dict(service_module.STRATEGIES_BY_NAME, basic_strategy=conservative_strategy):
+                self.assertEqual(EdgeService(cache_path).estimates, {})
+            #an engine that changed since
+            with mock.patch('result_cache.ENGINE_VERSION', -1):
+                self.assertEqual(EdgeService(cache_path).estimates, {})
+            self.assertEqual(EdgeService(cache_path).estimates, service.estimates)
+
+
+if __name__ == "__main__":
+    unittest.main()